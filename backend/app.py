@@ -1,451 +1,2528 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, Response, g, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
 import requests
 import os
+import abc
+import asyncio
+import atexit
 import datetime
+import base64
+import gc
+import hashlib
+import heapq
+import itertools
+import json
+import logging
+import math
+import mimetypes
+import mmap
+import queue
+import random
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from collections.abc import Mapping
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dotenv import load_dotenv
+from logging.handlers import QueueHandler, QueueListener
+from requests.adapters import HTTPAdapter
+from urllib.parse import parse_qs
+
+# Only needed for the ASGI entry point, so they are imported on first use
+# (see load_async_dependencies) rather than in every WSGI worker
+httpx = WSGIMiddleware = None
+
+def load_async_dependencies():
+    """Import httpx and a2wsgi if not done yet; False if they are not installed"""
+    global httpx, WSGIMiddleware
+    if httpx is None:
+        try:
+            import httpx
+            from a2wsgi import WSGIMiddleware
+        except ImportError:
+            return False
+    return True
 
 # Load environment variables
 load_dotenv()
 
-# Get Spoonacular API key from environment variable with fallback
-SPOONACULAR_API_KEY = os.getenv('SPOONACULAR_API_KEY') or '14ed33f55842459298f8a6548333a21c'
-SPOONACULAR_BASE_URL = 'https://api.spoonacular.com'
+class StructuredFormatter(logging.Formatter):
+    """One line per record: JSON objects, or ``message key=value ...`` text.
+
+    Anything passed through ``extra=`` becomes a field of the line.
+    """
+
+    _RESERVED = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+    def __init__(self, style='json'):
+        super().__init__()
+        self.style = style
+
+    def format(self, record):
+        fields = {key: value for key, value in vars(record).items() if key not in self._RESERVED}
+        if record.exc_info:
+            fields['exception'] = self.formatException(record.exc_info)
+        if self.style == 'json':
+            line = {
+                'ts': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec='milliseconds'),
+                'level': record.levelname,
+                'logger': record.name,
+                'pid': record.process,
+                'message': record.getMessage(),
+                **fields
+            }
+            return json.dumps(line, default=str)
+        pairs = ' '.join(f'{key}={value}' for key, value in fields.items())
+        return f'{self.formatTime(record)} {record.levelname} {record.name} {record.getMessage()} {pairs}'.rstrip()
+
+class SamplingFilter(logging.Filter):
+    """Keep roughly ``rate`` of the records below WARNING; warnings and errors always pass"""
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+class BackgroundLogHandler(QueueHandler):
+    """Hands records to a queue; a listener thread formats and writes them.
+
+    Request threads only pay for an enqueue. The listener is started
+    lazily in each process, so it also runs in forked gunicorn workers.
+    """
+
+    def __init__(self, target, maxsize=10000):
+        super().__init__(queue.Queue(maxsize))
+        self.target = target
+        self.dropped = 0
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def prepare(self, record):
+        # Formatting is the listener's job; the record stays in this process
+        return record
+
+    def enqueue(self, record):
+        if self._listener_pid != os.getpid():
+            with self._listener_lock:
+                if self._listener_pid != os.getpid():
+                    self.queue = queue.Queue(self.queue.maxsize)
+                    listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+                    listener.start()
+                    # Drain what's queued when the process exits
+                    atexit.register(listener.stop)
+                    self._listener_pid = os.getpid()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+def configure_logging():
+    level = getattr(logging, (os.environ.get('LOG_LEVEL') or 'INFO').upper(), logging.INFO)
+    target = logging.StreamHandler()
+    target.setFormatter(StructuredFormatter(os.environ.get('LOG_FORMAT') or 'json'))
+    handler = BackgroundLogHandler(target)
+
+    logger = logging.getLogger('calorie_tracker')
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    logger.propagate = False
+
+    # Per-request lines are sampled so busy workers don't drown in their own logs
+    request_logger = logging.getLogger('calorie_tracker.requests')
+    request_logger.addFilter(SamplingFilter(float(os.environ.get('LOG_SAMPLE_RATE', 0.1))))
+    return logger, request_logger
+
+log, request_log = configure_logging()
+
+# Get Spoonacular API key from environment variable with fallback
+SPOONACULAR_API_KEY = os.getenv('SPOONACULAR_API_KEY') or '14ed33f55842459298f8a6548333a21c'
+SPOONACULAR_BASE_URL = os.getenv('SPOONACULAR_BASE_URL') or 'https://api.spoonacular.com'
+
+# For production deployment, serve React static files. They are served by
+# the routes at the bottom from the StaticAssets manifest, so Flask's own
+# static route is turned off.
+static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'build')
+app = Flask(__name__, static_folder=None)
+
+if os.path.exists(static_folder):
+    # Listing the build is only for debugging deployments; every worker
+    # imports this module, so skip the scans otherwise
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('Files in static folder', extra={'path': static_folder, 'files': os.listdir(static_folder)})
+        # Check if static/js directory exists
+        js_folder = os.path.join(static_folder, 'static', 'js')
+        if os.path.exists(js_folder):
+            log.debug('JS files in static/js', extra={'files': os.listdir(js_folder)})
+        else:
+            log.debug('static/js directory does not exist')
+else:
+    # Try alternative path for production deployment
+    alternative_static = os.path.join(os.getcwd(), 'frontend', 'build')
+    if os.path.exists(alternative_static):
+        static_folder = alternative_static
+        log.info('Using alternative static folder', extra={'path': alternative_static})
+    else:
+        log.warning('No static folder found - frontend may not be available', extra={'tried': [static_folder, alternative_static]})
+
+# Configure CORS for production
+if os.environ.get('FLASK_ENV') == 'production':
+    CORS_ORIGINS = "*"
+    CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}})
+else:
+    CORS_ORIGINS = ["http://localhost:3000"]
+    CORS(app, resources={
+        r"/api/*": {
+            "origins": CORS_ORIGINS,
+            "methods": ["GET", "POST", "OPTIONS"],
+            "allow_headers": ["Content-Type", "X-User-Id"]
+        }
+    })
+
+# Shared on-disk state (caches, food log) lives here so every gunicorn
+# worker on the box sees the same data
+DATA_DIR = os.environ.get('DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'instance')
+
+def _process_alive(filename):
+    """Whether the process whose pid names ``filename`` ('1234.json') is still running"""
+    try:
+        pid = int(filename.split('.', 1)[0])
+        if pid <= 0:
+            return False
+        os.kill(pid, 0)
+    except (ValueError, OverflowError, ProcessLookupError):
+        return False
+    except PermissionError:
+        # Running, as another user
+        return True
+    return True
+
+class MetricsRegistry:
+    """Counters, gauges and latency histograms rendered in Prometheus text format.
+
+    Each worker keeps its own metrics in memory and periodically writes a
+    snapshot to ``directory``; ``/metrics`` merges the fresh snapshots of
+    every worker so a scrape sees the whole box, not one random worker.
+    """
+
+    BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    SNAPSHOT_INTERVAL = 5
+    # Snapshots older than this are deleted by the next scrape once their
+    # worker has gone away; an idle worker's old snapshot is still current
+    SNAPSHOT_MAX_AGE = 300
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._descriptions = {}
+        self._counters = defaultdict(int)
+        self._gauges = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+        self._snapshot_at = 0.0
+
+    def describe(self, name, kind, help_text):
+        self._descriptions[name] = (kind, help_text)
+
+    def add_collector(self, collector):
+        """Register ``collector()`` -> iterable of ``(name, labels, value)`` read at snapshot time"""
+        self._collectors.append(collector)
+
+    def inc(self, name, amount=1, **labels):
+        with self._lock:
+            self._counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [[0] * len(self.BUCKETS), 0.0, 0]
+            buckets = histogram[0]
+            for i, bound in enumerate(self.BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+            histogram[1] += seconds
+            histogram[2] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def snapshot(self):
+        with self._lock:
+            counters, gauges = dict(self._counters), dict(self._gauges)
+        for collector in self._collectors:
+            for name, labels, value in collector():
+                kind, _ = self._descriptions.get(name, ('gauge', ''))
+                (counters if kind == 'counter' else gauges)[(name, tuple(sorted(labels.items())))] = value
+        with self._lock:
+            return {
+                'counters': [[name, labels, value] for (name, labels), value in counters.items()],
+                'gauges': [[name, labels, value] for (name, labels), value in gauges.items()],
+                'histograms': [
+                    [name, labels, list(buckets), total, count]
+                    for (name, labels), (buckets, total, count) in self._histograms.items()
+                ]
+            }
+
+    def snapshot_due(self):
+        """Whether SNAPSHOT_INTERVAL has passed since the last snapshot"""
+        return time.monotonic() - self._snapshot_at >= self.SNAPSHOT_INTERVAL
+
+    def write_snapshot(self, force=False):
+        """Publish this worker's metrics for ``/metrics``, at most every SNAPSHOT_INTERVAL"""
+        if not force and not self.snapshot_due():
+            return
+        self._snapshot_at = time.monotonic()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+    def _merged_snapshots(self):
+        counters, gauges, histograms = defaultdict(int), {}, {}
+        cutoff = time.time() - self.SNAPSHOT_MAX_AGE
+        for filename in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, filename)
+            try:
+                if os.path.getmtime(path) < cutoff and (filename.endswith('.tmp') or not _process_alive(filename)):
+                    # A worker that has gone away, or a half-written leftover
+                    os.remove(path)
+                    continue
+                if not filename.endswith('.json'):
+                    continue
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                # Another worker's scrape may have just removed it
+                continue
+            for name, labels, value in snapshot['counters']:
+                counters[(name, tuple(map(tuple, labels)))] += value
+            for name, labels, value in snapshot['gauges']:
+                gauges[(name, tuple(map(tuple, labels)))] = value
+            for name, labels, buckets, total, count in snapshot['histograms']:
+                merged = histograms.setdefault((name, tuple(map(tuple, labels))), [[0] * len(buckets), 0.0, 0])
+                merged[0] = [a + b for a, b in zip(merged[0], buckets)]
+                merged[1] += total
+                merged[2] += count
+        return counters, gauges, histograms
+
+    def render(self):
+        """All workers' metrics in the Prometheus text exposition format"""
+        self.write_snapshot(force=True)
+        counters, gauges, histograms = self._merged_snapshots()
+
+        def label_text(labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return ''
+            escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+            return '{' + ','.join(f'{key}="{value}"' for (key, _), value in zip(pairs, escaped)) + '}'
+
+        lines = []
+        for kind, series in (('counter', counters), ('gauge', gauges), ('histogram', histograms)):
+            for name in sorted({name for name, _ in series}):
+                _, help_text = self._descriptions.get(name, (kind, ''))
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                for (series_name, labels), value in sorted(series.items()):
+                    if series_name != name:
+                        continue
+                    if kind != 'histogram':
+                        lines.append(f'{name}{label_text(labels)} {value}')
+                        continue
+                    buckets, total, count = value
+                    for bound, bucket_count in zip(self.BUCKETS, buckets):
+                        lines.append(f'{name}_bucket{label_text(labels, [("le", bound)])} {bucket_count}')
+                    lines.append(f'{name}_bucket{label_text(labels, [("le", "+Inf")])} {count}')
+                    lines.append(f'{name}_sum{label_text(labels)} {total}')
+                    lines.append(f'{name}_count{label_text(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry(os.environ.get('METRICS_DIR') or os.path.join(DATA_DIR, 'metrics'))
+metrics.describe('http_requests_total', 'counter', 'HTTP requests by route, method and status')
+metrics.describe('http_request_duration_seconds', 'histogram', 'Time to handle an HTTP request, by route')
+metrics.describe('stage_duration_seconds', 'histogram', 'Time spent in each stage of a search (local_search, upstream_fetch, upstream_wait, serialization)')
+metrics.describe('upstream_requests_total', 'counter', 'Spoonacular calls by endpoint and HTTP status')
+metrics.describe('upstream_errors_total', 'counter', 'Failed Spoonacular calls by endpoint and kind')
+metrics.describe('upstream_request_duration_seconds', 'histogram', 'Time per Spoonacular HTTP call, including retries')
+metrics.describe('cache_requests_total', 'counter', 'Response cache lookups by cache and result')
+metrics.describe('upstream_circuit_open', 'gauge', '1 while the Spoonacular circuit breaker is open')
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, route=route)
+        metrics.inc('http_requests_total', route=route, method=request.method, status=str(response.status_code))
+        request_log.info('Request', extra={
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2)
+        })
+        metrics.write_snapshot()
+    return response
+
+class SharedDatabase:
+    """SQLite database in WAL mode shared by all worker processes.
+
+    Connections are opened lazily per thread and per process, so the object
+    can be created at import time and survive gunicorn forking its workers.
+    """
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self._local = threading.local()
+
+    def connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(self.schema)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        return conn
+
+# Nutrients summed into the per-day and per-week running totals
+SUMMARY_NUTRIENTS = ('calories', 'protein', 'fat', 'carbs')
+
+def _nutrient_amount(entry, name):
+    """Numeric amount of ``name`` in a logged entry, 0 if absent, malformed or not finite"""
+    nutrition = entry.get('nutrition')
+    amount = nutrition.get(name) if isinstance(nutrition, dict) else None
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount):
+        return 0
+    return amount
+
+def _week_start(day):
+    """Monday of the ISO week containing ``day``"""
+    return day - datetime.timedelta(days=day.weekday())
+
+class FoodLogStore:
+    """Durable food log indexed by user and time.
+
+    Writes are group-committed: concurrent ``append`` calls queue their
+    entries and whichever thread takes the commit lock first writes the whole
+    queue in one transaction, so a burst of requests costs one commit rather
+    than one per entry. If that transaction fails, the batch is written
+    again one entry per transaction, so only the caller whose entry is bad
+    gets an error. The same transaction folds the new entries into running
+    per-day and per-week totals, so summaries never re-read the log.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS food_entries (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            logged_at TEXT NOT NULL,
+            entry TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS food_entries_user_time ON food_entries (user_id, logged_at, id);
+        CREATE TABLE IF NOT EXISTS daily_totals (
+            user_id TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            calories REAL NOT NULL,
+            protein REAL NOT NULL,
+            fat REAL NOT NULL,
+            carbs REAL NOT NULL,
+            PRIMARY KEY (user_id, period_start)
+        );
+        CREATE TABLE IF NOT EXISTS weekly_totals (
+            user_id TEXT NOT NULL,
+            period_start TEXT NOT NULL,
+            entries INTEGER NOT NULL,
+            calories REAL NOT NULL,
+            protein REAL NOT NULL,
+            fat REAL NOT NULL,
+            carbs REAL NOT NULL,
+            PRIMARY KEY (user_id, period_start)
+        );
+    '''
+    TOTALS_TABLES = {'day': 'daily_totals', 'week': 'weekly_totals'}
+
+    def __init__(self, path):
+        self.db = SharedDatabase(path, self.SCHEMA)
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    def add_many(self, user_id, entries):
+        """Write ``entries`` (each carrying a ``timestamp``) in a single transaction"""
+        self._insert([(user_id, entry) for entry in entries])
+
+    def append(self, user_id, entry):
+        """Durably add one entry, batched with any other entries queued meanwhile"""
+        waiter = {'done': threading.Event(), 'error': None}
+        with self._pending_lock:
+            self._pending.append((user_id, entry, waiter))
+
+        with self._commit_lock:
+            if not waiter['done'].is_set():
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                errors = self._commit([(user_id, entry) for user_id, entry, _ in batch])
+                for (_, _, queued), error in zip(batch, errors):
+                    queued['error'] = error
+                    queued['done'].set()
+
+        if waiter['error'] is not None:
+            raise waiter['error']
+
+    def _commit(self, items):
+        """Write ``items`` in one transaction, or one each if that fails; the error of every item, ``None`` once written"""
+        try:
+            self._insert(items)
+            return [None] * len(items)
+        except Exception as e:
+            if len(items) == 1:
+                return [e]
+        errors = []
+        for item in items:
+            try:
+                self._insert([item])
+                errors.append(None)
+            except Exception as e:
+                errors.append(e)
+        return errors
+
+    def _insert(self, items):
+        conn = self.db.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO food_entries (user_id, logged_at, entry) VALUES (?, ?, ?)',
+                [(user_id, entry['timestamp'], json.dumps(entry)) for user_id, entry in items]
+            )
+            self._add_to_totals(conn, items)
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        conn.execute('COMMIT')
+
+    def _add_to_totals(self, conn, items):
+        # Sum the batch in memory first: one upsert per touched day/week
+        deltas = {period: defaultdict(lambda: [0] * (len(SUMMARY_NUTRIENTS) + 1)) for period in self.TOTALS_TABLES}
+        for user_id, entry in items:
+            day = datetime.datetime.fromisoformat(entry['timestamp']).date()
+            amounts = [1] + [_nutrient_amount(entry, name) for name in SUMMARY_NUTRIENTS]
+            for period, period_start in (('day', day), ('week', _week_start(day))):
+                totals = deltas[period][(user_id, period_start.isoformat())]
+                for i, amount in enumerate(amounts):
+                    totals[i] += amount
+
+        columns = ', '.join(('entries',) + SUMMARY_NUTRIENTS)
+        placeholders = ', '.join('?' * (len(SUMMARY_NUTRIENTS) + 3))
+        updates = ', '.join(f'{column} = {column} + excluded.{column}' for column in ('entries',) + SUMMARY_NUTRIENTS)
+        for period, table in self.TOTALS_TABLES.items():
+            conn.executemany(
+                f'INSERT INTO {table} (user_id, period_start, {columns}) VALUES ({placeholders})'
+                f' ON CONFLICT (user_id, period_start) DO UPDATE SET {updates}',
+                [(user_id, period_start, *totals) for (user_id, period_start), totals in deltas[period].items()]
+            )
+
+    def totals(self, period, user_id, start, end):
+        """Running totals for each ``period`` ('day' or 'week') starting in ``[start, end]``"""
+        columns = ', '.join(('period_start', 'entries') + SUMMARY_NUTRIENTS)
+        rows = self.db.connection().execute(
+            f'SELECT {columns} FROM {self.TOTALS_TABLES[period]}'
+            ' WHERE user_id = ? AND period_start >= ? AND period_start <= ?'
+            ' ORDER BY period_start',
+            (user_id, start, end)
+        )
+        return {row[0]: row[1:] for row in rows}
+
+    def entries(self, user_id, start, end):
+        """Entries logged by ``user_id`` with ``start <= timestamp < end`` (ISO strings)"""
+        rows = self.db.connection().execute(
+            'SELECT entry FROM food_entries'
+            ' WHERE user_id = ? AND logged_at >= ? AND logged_at < ?'
+            ' ORDER BY logged_at, id',
+            (user_id, start, end)
+        )
+        return [json.loads(entry) for (entry,) in rows]
+
+    def page(self, user_id, start, end, after=None, limit=100):
+        """One keyset page of ``entries``: ``(entries, position of the last one)``.
+
+        ``after`` is the position returned by the previous page, so paging
+        costs an index seek instead of an OFFSET scan however deep it goes.
+        """
+        after_time, after_id = after or ('', 0)
+        rows = self.db.connection().execute(
+            'SELECT logged_at, id, entry FROM food_entries'
+            ' WHERE user_id = ? AND logged_at >= ? AND logged_at < ?'
+            ' AND (logged_at, id) > (?, ?)'
+            ' ORDER BY logged_at, id LIMIT ?',
+            (user_id, start, end, after_time, after_id, limit)
+        ).fetchall()
+        last = (rows[-1][0], rows[-1][1]) if rows else None
+        return [json.loads(entry) for _, _, entry in rows], last
+
+    def iter_entries(self, user_id, start, end, after=None, chunk_size=500):
+        """Yield ``entries`` lazily, reading ``chunk_size`` rows at a time"""
+        while True:
+            chunk, after = self.page(user_id, start, end, after, chunk_size)
+            yield from chunk
+            if len(chunk) < chunk_size:
+                return
+
+food_log_store = FoodLogStore(os.environ.get('FOOD_LOG_DB_PATH') or os.path.join(DATA_DIR, 'food_log.sqlite3'))
+
+# Indian foods database for fallback when Spoonacular API doesn't have results.
+# Dishes are added or corrected in this JSON file, no code changes needed.
+CATALOG_PATH = os.environ.get('CATALOG_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'indian_foods.json')
+
+def _number(value):
+    """Whole floats back to ints, so local nutrition serializes as before (168, not 168.0)"""
+    return int(value) if value.is_integer() else value
+
+class FoodCatalog(Mapping):
+    """Read-only food catalog in a compact, memory-mappable layout.
+
+    The JSON catalog is compiled into one binary image: a float64 nutrition
+    table, a uint32 offset table, open-addressing hash tables from key, id
+    and lowercased title to ordinal, and a single UTF-8 blob holding every
+    key, id, title, image URL and lowercased title. Workers mmap that image, so the catalog
+    and its lookups live once in the page cache however many workers there
+    are, and a record only becomes a dict when a request needs it. As a
+    Mapping it still behaves like the old ``{key: food_data}`` literal.
+    """
+
+    MAGIC = b'FOODCAT2'
+    STRING_FIELDS = ('key', 'id', 'title', 'image', 'lowered_title')
+    # Fields with a hash table from value to ordinal
+    LOOKUP_FIELDS = ('key', 'id', 'lowered_title')
+
+    def __init__(self, image):
+        self._image = image
+        view = memoryview(image)
+        if bytes(view[:len(self.MAGIC)]) != self.MAGIC:
+            raise ValueError('Not a compiled food catalog')
+        position = len(self.MAGIC) + 4
+        (header_size,) = struct.unpack_from('=I', image, len(self.MAGIC))
+        header = json.loads(bytes(view[position:position + header_size]))
+        position += header_size
+
+        self.nutrients = tuple(header['nutrients'])
+        self._count = header['count']
+        # Size, mtime and hash of the JSON file the image was compiled from
+        self.source = header.get('source')
+        amounts_size = 8 * self._count * len(self.nutrients)
+        self._amounts = view[position:position + amounts_size].cast('d')
+        position += amounts_size
+        offsets_size = 4 * (self._count * len(self.STRING_FIELDS) + 1)
+        self._offsets = view[position:position + offsets_size].cast('I')
+        position += offsets_size
+        # Slots hold ordinal + 1, 0 marks an empty slot
+        table_size = 4 * header['table_slots']
+        self._tables = {}
+        for field in self.LOOKUP_FIELDS:
+            self._tables[field] = (self.STRING_FIELDS.index(field), view[position:position + table_size].cast('I'))
+            position += table_size
+        self._strings_start = position
+        self._strings = view[position:]
+
+    @classmethod
+    def compile(cls, foods, source=None):
+        """Binary image for a ``{key: food_data}`` mapping, optionally noting the ``source`` file it came from"""
+        nutrients = list(dict.fromkeys(name for food_data in foods.values() for name in food_data['nutrition']))
+        amounts = array('d')
+        offsets = array('I', [0])
+        strings = bytearray()
+        # At most half full, so probes for a missing value stay short
+        table_slots = 1 << (2 * len(foods)).bit_length()
+        tables = [array('I', bytes(4 * table_slots)) for _ in cls.LOOKUP_FIELDS]
+        for ordinal, (food_key, food_data) in enumerate(foods.items()):
+            title = str(food_data['title'])
+            values = [str(food_key), str(food_data['id']), title, str(food_data.get('image', '')), title.lower()]
+            for value in values:
+                strings += value.encode('utf-8')
+                offsets.append(len(strings))
+            for field, table in zip(cls.LOOKUP_FIELDS, tables):
+                value = values[cls.STRING_FIELDS.index(field)]
+                slot = zlib.crc32(value.encode('utf-8')) & (table_slots - 1)
+                while table[slot]:
+                    slot = (slot + 1) & (table_slots - 1)
+                table[slot] = ordinal + 1
+            amounts.extend(float(food_data['nutrition'].get(name, 0)) for name in nutrients)
+
+        header = {'count': len(foods), 'nutrients': nutrients, 'table_slots': table_slots}
+        if source is not None:
+            header['source'] = source
+        header = json.dumps(header).encode('utf-8')
+        # Pad so the float table starts 8-byte aligned
+        header += b' ' * (-(len(cls.MAGIC) + 4 + len(header)) % 8)
+        return b''.join([
+            cls.MAGIC, struct.pack('=I', len(header)), header,
+            amounts.tobytes(), offsets.tobytes(), *(table.tobytes() for table in tables), bytes(strings)
+        ])
+
+    @classmethod
+    def load(cls, json_path, compiled_path):
+        """Map ``compiled_path``, recompiling it first unless it was built from ``json_path`` as it is now.
+
+        The image header records the size, mtime and SHA-256 of the JSON it
+        was compiled from. A matching size and mtime is trusted as is;
+        otherwise the file is hashed, so a fresh checkout with new mtimes
+        reuses the image while any edit, whatever its timestamps, rebuilds it.
+        """
+        stat = os.stat(json_path)
+        try:
+            with open(compiled_path, 'rb') as f:
+                compiled = cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+            source = compiled.source or {}
+        except (OSError, ValueError, struct.error):
+            compiled, source = None, {}
+
+        if source.get('size') == stat.st_size and source.get('mtime_ns') == stat.st_mtime_ns:
+            return compiled
+        with open(json_path, 'rb') as f:
+            raw = f.read()
+        digest = hashlib.sha256(raw).hexdigest()
+        if source.get('sha256') == digest:
+            return compiled
+
+        image = cls.compile(json.loads(raw), source={'size': len(raw), 'mtime_ns': stat.st_mtime_ns, 'sha256': digest})
+        try:
+            os.makedirs(os.path.dirname(compiled_path) or '.', exist_ok=True)
+            # Write then rename, so workers never map a half-written image
+            tmp_path = f'{compiled_path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(image)
+            os.replace(tmp_path, compiled_path)
+        except OSError:
+            # Read-only filesystem: keep a private in-memory copy instead
+            return cls(image)
+
+        with open(compiled_path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _string(self, ordinal, field):
+        slot = ordinal * len(self.STRING_FIELDS) + field
+        return str(self._strings[self._offsets[slot]:self._offsets[slot + 1]], 'utf-8')
+
+    def _lookup(self, field, value):
+        """Ordinals whose ``field`` equals ``value``, in probe order"""
+        number, table = self._tables[field]
+        mask = len(table) - 1
+        encoded = value.encode('utf-8')
+        slot = zlib.crc32(encoded) & mask
+        found = []
+        entry = table[slot]
+        while entry:
+            position = (entry - 1) * len(self.STRING_FIELDS) + number
+            if self._strings[self._offsets[position]:self._offsets[position + 1]] == encoded:
+                found.append(entry - 1)
+            slot = (slot + 1) & mask
+            entry = table[slot]
+        return found
+
+    def find(self, ordinal, field, encoded):
+        """Byte offset of UTF-8 ``encoded`` in the ``field`` string (by number) of ``ordinal``, or -1.
+
+        Searches the image in place, without decoding the string.
+        """
+        slot = ordinal * len(self.STRING_FIELDS) + field
+        start = self._strings_start + self._offsets[slot]
+        position = self._image.find(encoded, start, self._strings_start + self._offsets[slot + 1])
+        return position if position < 0 else position - start
+
+    def ordinal(self, food_key):
+        """Ordinal of ``food_key``, or ``None``"""
+        found = self._lookup('key', food_key)
+        return found[0] if found else None
+
+    def ordinal_of_id(self, food_id):
+        """Ordinal of the food with ``food_id`` (the last one, if repeated), or ``None``"""
+        return max(self._lookup('id', food_id), default=None)
+
+    def title_ordinals(self, title):
+        """Ascending ordinals of the foods titled ``title``, compared lowercase"""
+        return sorted(self._lookup('lowered_title', title.lower()))
+
+    def key(self, ordinal):
+        return self._string(ordinal, 0)
+
+    def food_id(self, ordinal):
+        return self._string(ordinal, 1)
+
+    def title(self, ordinal):
+        return self._string(ordinal, 2)
+
+    def lowered_title(self, ordinal):
+        return self._string(ordinal, 4)
+
+    def record(self, ordinal):
+        """The food at ``ordinal`` as the dict the API returns"""
+        base = ordinal * len(self.nutrients)
+        return {
+            'id': self.food_id(ordinal),
+            'title': self.title(ordinal),
+            'image': self._string(ordinal, 3),
+            'nutrition': {name: _number(self._amounts[base + i]) for i, name in enumerate(self.nutrients)}
+        }
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        return (self.key(ordinal) for ordinal in range(self._count))
+
+    def __getitem__(self, food_key):
+        ordinal = self.ordinal(food_key)
+        if ordinal is None:
+            raise KeyError(food_key)
+        return self.record(ordinal)
+
+COMPILED_CATALOG_PATH = os.path.join(DATA_DIR, 'indian_foods.catalog')
+
+def _ngrams(text, max_size):
+    """Every distinct substring of ``text`` up to ``max_size`` characters long"""
+    grams = set()
+    for size in range(1, max_size + 1):
+        for start in range(len(text) - size + 1):
+            grams.add(text[start:start + size])
+    return grams
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+def _words(text):
+    """Lowercase alphanumeric words of ``text``, e.g. 'idli (2 pieces)' -> ['idli', '2', 'pieces']"""
+    return re.findall(r'[a-z0-9]+', text.lower())
+
+def _trigrams(word):
+    """Padded trigrams of a single word, so short words and word edges still match"""
+    padded = f'  {word} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _carry_over_postings(old_postings, remap, postings):
+    """Copy ``old_postings`` into ``postings`` with ordinals renumbered through ``remap``"""
+    for term, ordinals in old_postings.items():
+        kept = [remap[ordinal] for ordinal in ordinals if remap[ordinal] >= 0]
+        if kept:
+            postings[term] = kept
+
+def _is_increasing(values):
+    previous = -1
+    for value in values:
+        if value <= previous:
+            return False
+        previous = value
+    return True
+
+class FoodSearchIndex:
+    """Precomputed lookup structures over the local food catalog.
+
+    Built once from a FoodCatalog so a query only touches
+    the entries that can actually match instead of scanning the whole
+    catalog. Matching follows the original linear scan: the query is a
+    substring of the key or the title, or the key is a substring of the
+    query.
+
+    For typo-tolerant lookups the distinct words of all keys and titles are
+    also indexed by padded trigram, so a misspelt query word ('biriyani')
+    only has to be compared against vocabulary words sharing a trigram with
+    it before its matches are looked up in the token map.
+
+    Only ordinal postings live here; keys, titles and the key, id and title
+    lookups are read from the catalog image when a query needs them, so
+    the index costs a few compact arrays rather than Python objects per
+    entry.
+
+    Passing the ``previous`` index rebuilds incrementally: postings of
+    entries whose key and title are unchanged are carried over with their
+    ordinals remapped, and only new or edited entries are re-tokenized.
+    """
+
+    GRAM_SIZE = 3
+    # Minimum trigram (Jaccard) similarity for a fuzzy word or entry match
+    FUZZY_THRESHOLD = 0.35
+    # Above this many vocabulary words sharing a prefix, prefix matches are
+    # found by checking substring candidates instead of merging postings
+    MAX_PREFIX_WORDS = 64
+    # Gram postings up to this long are checked entry by entry; longer ones
+    # are intersected with the next rarest grams first
+    MAX_WALKED_POSTING = 256
+    # Closest vocabulary words considered for each word of a fuzzy query
+    MAX_FUZZY_WORDS = 8
+    # Fuzzy work grows with every query word, so only the first few distinct
+    # words are scored and the walk over their similarity groups is capped
+    MAX_FUZZY_QUERY_WORDS = 4
+    MAX_FUZZY_COMBINATIONS = 256
+
+    def __init__(self, catalog, previous=None):
+        self.catalog = catalog
+        key_prefix_lengths = defaultdict(set)
+        grams = defaultdict(list)
+        tokens = defaultdict(list)
+
+        # remap[old ordinal] -> new ordinal for entries that can be reused
+        remap = array('l', [-1]) * len(previous) if previous is not None else None
+        changed = []
+        for ordinal in range(len(catalog)):
+            food_key = catalog.key(ordinal)
+            key_prefix_lengths[food_key[:self.GRAM_SIZE]].add(len(food_key))
+
+            old_ordinal = previous.catalog.ordinal(food_key) if previous is not None else None
+            if old_ordinal is not None and previous.catalog.lowered_title(old_ordinal) == catalog.lowered_title(ordinal):
+                remap[old_ordinal] = ordinal
+            else:
+                changed.append(ordinal)
+        self.reindexed = len(changed)
+        # First GRAM_SIZE characters of a key -> lengths of keys starting so
+        self._key_prefix_lengths = {prefix: sorted(lengths) for prefix, lengths in key_prefix_lengths.items()}
+
+        if previous is not None:
+            _carry_over_postings(previous._grams, remap, grams)
+            _carry_over_postings(previous._tokens, remap, tokens)
+
+        touched_grams, touched_tokens = set(), set()
+        for ordinal in changed:
+            food_key, title = catalog.key(ordinal), catalog.lowered_title(ordinal)
+            for gram in _ngrams(food_key, self.GRAM_SIZE) | _ngrams(title, self.GRAM_SIZE):
+                grams[gram].append(ordinal)
+                touched_grams.add(gram)
+            for token in set(_words(food_key)) | set(_words(title)):
+                tokens[token].append(ordinal)
+                touched_tokens.add(token)
+
+        # Lists are already sorted on a full build, and carried-over entries
+        # stay sorted unless the file reordered them; only lists that had
+        # edited entries appended need sorting before packing them into
+        # compact unsigned arrays.
+        reordered = previous is not None and not _is_increasing(ordinal for ordinal in remap if ordinal >= 0)
+        def pack(ordinals, needs_sort):
+            if reordered or (previous is not None and needs_sort):
+                ordinals.sort()
+            return array('I', ordinals)
+        self._grams = {gram: pack(ordinals, gram in touched_grams) for gram, ordinals in grams.items()}
+        self._tokens = {token: pack(ordinals, token in touched_tokens) for token, ordinals in tokens.items()}
+
+        self._vocabulary = list(self._tokens)
+        self._sorted_vocabulary = sorted(self._vocabulary)
+        self._vocabulary_gram_counts = array('H')
+        word_grams = defaultdict(list)
+        for word_id, word in enumerate(self._vocabulary):
+            word_trigrams = _trigrams(word)
+            self._vocabulary_gram_counts.append(len(word_trigrams))
+            for gram in word_trigrams:
+                word_grams[gram].append(word_id)
+        self._word_grams = {gram: array('I', word_ids) for gram, word_ids in word_grams.items()}
+
+    def __len__(self):
+        return len(self.catalog)
+
+    def get_by_id(self, food_id):
+        """Return the record with the given ``id`` or ``None``"""
+        ordinal = self.catalog.ordinal_of_id(food_id)
+        return None if ordinal is None else self.catalog.record(ordinal)
+
+    def _words_containing(self, word):
+        """Vocabulary words that contain ``word`` (longer than GRAM_SIZE), found through their trigrams"""
+        postings = []
+        for gram in {word[start:start + 3] for start in range(len(word) - 2)}:
+            posting = self._word_grams.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        return [
+            self._vocabulary[word_id] for word_id in min(postings, key=len)
+            if word in self._vocabulary[word_id]
+        ]
+
+    def _substring_candidates(self, query):
+        """Ascending postings whose union holds every ordinal that may contain ``query``.
+
+        Short queries are indexed grams themselves. A query of letters and
+        digits only can only match inside one word, so its matches are the
+        postings of the vocabulary words containing it. Anything longer is
+        narrowed by what each of its words must be - a whole token between
+        separators, part of one at either end - and by the grams spanning a
+        separator ('n j' in 'jamun jamun'), rarest first.
+        """
+        if len(query) <= self.GRAM_SIZE:
+            # Every short substring of a key/title is itself an indexed gram
+            return [self._grams.get(query, ())]
+        if _WORD.fullmatch(query):
+            return [self._tokens[word] for word in self._words_containing(query)]
+
+        constraints = {}
+        for match in _WORD.finditer(query):
+            word = match.group()
+            if 0 < match.start() and match.end() < len(query):
+                constraints[word, True] = self._tokens.get(word, ())
+            elif (word, False) not in constraints:
+                if len(word) <= self.GRAM_SIZE:
+                    constraints[word, False] = self._grams.get(word, ())
+                else:
+                    tokens = [self._tokens[token] for token in self._words_containing(word)]
+                    constraints[word, False] = tokens[0] if len(tokens) == 1 else set().union(*tokens)
+        for start in range(len(query) - self.GRAM_SIZE + 1):
+            gram = query[start:start + self.GRAM_SIZE]
+            if gram not in constraints and not _WORD.fullmatch(gram):
+                constraints[gram] = self._grams.get(gram, ())
+
+        postings = sorted(constraints.values(), key=len)
+        if not postings[0]:
+            return []
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            # Checking a candidate costs far more than intersecting one entry
+            if len(candidates) <= self.MAX_WALKED_POSTING // 8 or len(posting) > 16 * len(candidates):
+                break
+            candidates.intersection_update(posting)
+        return [sorted(candidates)]
+
+    @staticmethod
+    def _union(postings):
+        """The ordinals of ascending ``postings``, merged in ascending order without repeats"""
+        if len(postings) == 1:
+            return postings[0]
+        return (ordinal for ordinal, _ in itertools.groupby(heapq.merge(*postings)))
+
+    def _word_prefix_candidates(self, query):
+        """Ordinals with a word starting like ``query``, ascending.
+
+        Returns ``None`` when the query doesn't start with a word or too
+        many vocabulary words share its prefix to merge their postings.
+        """
+        match = re.match(r'[a-z0-9]+', query)
+        if match is None:
+            return None
+        prefix = match.group()
+        low = bisect_left(self._sorted_vocabulary, prefix)
+        high = bisect_left(self._sorted_vocabulary, prefix + '{', low)  # '{' sorts right after 'z'
+        if high - low > self.MAX_PREFIX_WORDS:
+            return None
+        return self._union([self._tokens[word] for word in self._sorted_vocabulary[low:high]])
+
+    def _contained_keys(self, query):
+        """Ordinals whose key appears somewhere inside ``query``"""
+        found = []
+        for start in range(len(query)):
+            # Only lengths of keys that start like this position can match
+            for size in range(1, min(self.GRAM_SIZE, len(query) - start) + 1):
+                for length in self._key_prefix_lengths.get(query[start:start + size], ()):
+                    ordinal = self.catalog.ordinal(query[start:start + length])
+                    if ordinal is not None:
+                        found.append(ordinal)
+        return found
+
+    def search(self, query, limit=10):
+        """Return up to ``limit`` matching records, best matches first.
+
+        Results are ranked exact match, whole word, word prefix, any
+        substring, then keys contained in the query, ties broken by catalog
+        order. Each tier is walked in catalog order and the walk stops as
+        soon as ``limit`` records are collected, so later tiers are only
+        looked at when the earlier ones run short.
+        """
+        query = query.lower().strip()
+        if limit <= 0:
+            return []
+        if not query:
+            # An empty string is contained in every key
+            return [self.catalog.record(ordinal) for ordinal in range(min(limit, len(self.catalog)))]
+
+        catalog = self.catalog
+        # Keys (field 0) and lowered titles (field 4) are searched in place
+        encoded, spaced = query.encode('utf-8'), (' ' + query).encode('utf-8')
+        find = catalog.find
+        found = {}
+
+        def collect(ordinals, accept=None):
+            """Add unseen accepted ordinals in order; True once ``limit`` are found"""
+            for ordinal in ordinals:
+                if ordinal not in found and (accept is None or accept(ordinal)):
+                    found[ordinal] = None
+                    if len(found) == limit:
+                        return True
+            return False
+
+        def contains(ordinal):
+            return find(ordinal, 0, encoded) != -1 or find(ordinal, 4, encoded) != -1
+
+        def starts_word(ordinal):
+            for field in (0, 4):
+                position = find(ordinal, field, encoded)
+                if position == 0 or (position > 0 and find(ordinal, field, spaced) != -1):
+                    return True
+            return False
+
+        key_ordinal = catalog.ordinal(query)
+        exact = sorted(catalog.title_ordinals(query) + ([] if key_ordinal is None else [key_ordinal]))
+        candidates = self._substring_candidates(query)
+        # Several words already narrow the candidates more than a prefix would
+        prefixed = self._word_prefix_candidates(query) if len(_words(query)) < 2 else None
+        (
+            collect(exact)
+            or collect(self._tokens.get(query, ()), contains)
+            or collect(self._union(candidates) if prefixed is None else prefixed, starts_word)
+            or collect(self._union(candidates), contains)
+            or collect(sorted(self._contained_keys(query)))
+        )
+        return [self.catalog.record(ordinal) for ordinal in found]
+
+    def similar_words(self, word):
+        """``{vocabulary word: similarity}`` for words close enough to ``word``"""
+        word_trigrams = _trigrams(word)
+        shared = defaultdict(int)
+        for gram in word_trigrams:
+            for word_id in self._word_grams.get(gram, ()):
+                shared[word_id] += 1
+
+        similar = {}
+        for word_id, count in shared.items():
+            score = count / (len(word_trigrams) + self._vocabulary_gram_counts[word_id] - count)
+            if score >= self.FUZZY_THRESHOLD:
+                similar[self._vocabulary[word_id]] = score
+        return similar
+
+    def _fuzzy_levels(self, query_word):
+        """``[(similarity, entries)]`` best first, each entry under its closest word's similarity.
+
+        Only the ``MAX_FUZZY_WORDS`` closest vocabulary words count.
+        """
+        similar = self.similar_words(query_word)
+        levels, reached = [], set()
+        words = sorted(similar, key=lambda word: (-similar[word], word))[:self.MAX_FUZZY_WORDS]
+        for similarity, group in itertools.groupby(words, key=similar.__getitem__):
+            entries = set()
+            for word in group:
+                entries.update(self._tokens[word])
+            entries -= reached
+            if entries:
+                levels.append((similarity, entries))
+                reached |= entries
+        return levels, reached
+
+    def fuzzy_search(self, query, limit=10):
+        """Typo-tolerant search ranked by similarity, best first.
+
+        Each query word scores every entry by its closest matching word; an
+        entry's score is the average over the query words, so 'paneer tika'
+        ranks paneer tikka dishes above other paneer dishes. Entries only
+        need one query word to match.
+
+        Rather than scoring entries one by one, the entries of each query
+        word are grouped by similarity and the combinations of those groups
+        are visited best total first, stopping once ``limit`` entries are
+        found; only the ``MAX_FUZZY_WORDS`` closest words per query word
+        are considered.
+
+        Only the first ``MAX_FUZZY_QUERY_WORDS`` distinct words of the query
+        count, and at most ``MAX_FUZZY_COMBINATIONS`` combinations are
+        visited, so a long query can't turn into an exponential walk.
+        """
+        query_words = list(dict.fromkeys(_words(query)))[:self.MAX_FUZZY_QUERY_WORDS]
+        if not query_words or limit <= 0:
+            return []
+
+        if len(query_words) == 1:
+            # An entry's score is just its best word's, so walk the words from
+            # most to least similar and stop as soon as ``limit`` are found
+            similar = self.similar_words(query_words[0])
+            found = {}
+            for word in sorted(similar, key=lambda word: (-similar[word], word)):
+                for ordinal in self._tokens[word]:
+                    found.setdefault(ordinal, len(found))
+                    if len(found) == limit:
+                        break
+                if len(found) == limit:
+                    break
+            return [self.catalog.record(ordinal) for ordinal in found]
+
+        # Per query word: its similarity groups, then a final "no match" group
+        per_word = []
+        for query_word in query_words:
+            levels, reached = self._fuzzy_levels(query_word)
+            per_word.append((levels + [(0.0, None)], reached))
+
+        def total(combination):
+            score = 0.0
+            for (levels, _), position in zip(per_word, combination):
+                score += levels[position][0] / len(query_words)
+            return score
+
+        start = (0,) * len(per_word)
+        pending, visited = [(-total(start), start)], {start}
+        scores, cutoff = {}, None
+        for _ in range(self.MAX_FUZZY_COMBINATIONS):
+            if not pending:
+                break
+            negated, combination = heapq.heappop(pending)
+            if cutoff is not None and -negated < cutoff:
+                break
+            for index, position in enumerate(combination):
+                if position + 1 < len(per_word[index][0]):
+                    following = combination[:index] + (position + 1,) + combination[index + 1:]
+                    if following not in visited:
+                        visited.add(following)
+                        heapq.heappush(pending, (-total(following), following))
+
+            matched = [per_word[index][0][position][1] for index, position in enumerate(combination)]
+            required = sorted((entries for entries in matched if entries is not None), key=len)
+            if not required:
+                continue
+            entries = required[0].intersection(*required[1:])
+            for index, entries_matched in enumerate(matched):
+                if entries_matched is None and entries:
+                    entries = entries - per_word[index][1]
+            for ordinal in entries:
+                scores[ordinal] = -negated
+            if cutoff is None and len(scores) >= limit:
+                cutoff = -negated
+
+        best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return [self.catalog.record(ordinal) for ordinal, _ in best]
+
+def load_indian_foods(catalog, previous=None, mtime=None):
+    """Build a fresh index for ``catalog`` and swap it in.
+
+    The index is replaced with a single assignment, so concurrent requests
+    see either the old or the new catalog but never a mix of both.
+
+    ``mtime`` is the catalog file's modification time when ``catalog`` was
+    loaded from CATALOG_PATH. A catalog built any other way (benchmarks,
+    tests) leaves it ``None``, so edits to the file don't replace it.
+    """
+    global INDIAN_FOODS_DB, indian_food_index, _catalog_mtime
+    index = FoodSearchIndex(catalog, previous=previous)
+    INDIAN_FOODS_DB, indian_food_index, _catalog_mtime = catalog, index, mtime
+    return index
+
+# Built on first use (or by create_app(preload=True) before gunicorn forks);
+# every search and id lookup reuses it
+INDIAN_FOODS_DB = None
+indian_food_index = None
+
+# Seconds between checks of the catalog file for edits (0 disables)
+CATALOG_CHECK_INTERVAL = float(os.environ.get('CATALOG_CHECK_INTERVAL', 5))
+
+_catalog_reload_lock = threading.Lock()
+_catalog_mtime = None
+_catalog_checked_at = 0.0
+
+def _load_catalog():
+    """Load the catalog and build its index, once; concurrent first requests wait for it"""
+    global _catalog_checked_at
+    with _catalog_reload_lock:
+        if indian_food_index is None:
+            mtime = os.path.getmtime(CATALOG_PATH)
+            _catalog_checked_at = time.monotonic()
+            load_indian_foods(FoodCatalog.load(CATALOG_PATH, COMPILED_CATALOG_PATH), mtime=mtime)
+    return indian_food_index
+
+def reload_indian_foods():
+    """Reload the catalog file and incrementally rebuild the index.
+
+    Requests keep using the current index while the new one is built, and
+    only one reload runs at a time per worker. Returns the new index, or
+    ``None`` if another reload was already in progress.
+    """
+    global _catalog_mtime
+    if not _catalog_reload_lock.acquire(blocking=False):
+        return None
+    try:
+        # Remember the version even if it fails to load, so a broken file
+        # is reported once rather than on every check
+        _catalog_mtime = os.path.getmtime(CATALOG_PATH)
+        catalog = FoodCatalog.load(CATALOG_PATH, COMPILED_CATALOG_PATH)
+        index = load_indian_foods(catalog, previous=indian_food_index, mtime=_catalog_mtime)
+        log.info('Reloaded food catalog', extra={'foods': len(index), 'reindexed': index.reindexed})
+        return index
+    finally:
+        _catalog_reload_lock.release()
+
+def _reload_catalog_in_background():
+    try:
+        reload_indian_foods()
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        log.error('Catalog reload failed, keeping the current catalog', extra={'error': str(e)})
+
+def current_food_index():
+    """The live index, kicking off a background reload if the catalog file changed.
+
+    Only a catalog loaded from CATALOG_PATH is watched.
+    """
+    global _catalog_checked_at
+    if indian_food_index is None:
+        return _load_catalog()
+    if not CATALOG_CHECK_INTERVAL or _catalog_mtime is None:
+        return indian_food_index
+    now = time.monotonic()
+    if now - _catalog_checked_at >= CATALOG_CHECK_INTERVAL:
+        _catalog_checked_at = now
+        try:
+            changed = os.path.getmtime(CATALOG_PATH) != _catalog_mtime
+        except OSError:
+            changed = False
+        if changed and not _catalog_reload_lock.locked():
+            threading.Thread(target=_reload_catalog_in_background, name='catalog-reload', daemon=True).start()
+    return indian_food_index
+
+def search_indian_foods(query):
+    """Search for Indian foods in our local database"""
+    index = current_food_index()
+    results = index.search(query, limit=10)  # Limit to 10 results
+    if not results:
+        # Fall back to spelling-tolerant matches ('biriyani', 'panner')
+        results = index.fuzzy_search(query, limit=10)
+    return results
+
+class UpstreamUnavailable(requests.RequestException):
+    """Raised instead of calling Spoonacular while the circuit breaker is open"""
+
+class QuotaExhausted(UpstreamUnavailable):
+    """Raised instead of calling Spoonacular when the call's priority has no budget left"""
+
+def _header_number(headers, name):
+    try:
+        return float(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+class QuotaGovernor:
+    """Spoonacular quota budget, shared by every worker through SQLite.
+
+    It tracks the points left for the day: our own running count, replaced
+    by what Spoonacular reports (X-API-Quota-Left, X-API-Quota-Request)
+    after every response. User requests may spend all of it, whenever they
+    come.
+
+    Background work is also paced by a token bucket that holds up to
+    ``burst`` points and refills at the daily quota spread over 24 hours,
+    and must leave a reserve of both the bucket and the day's quota
+    untouched. User requests drain the bucket too, so as the budget runs low
+    speculative prefetches are shed first, then warm-up refreshes, and user
+    requests only once the day's quota is gone. Shed calls raise
+    ``QuotaExhausted`` and callers fall back to local or cached data.
+    """
+
+    INTERACTIVE = 'interactive'
+    WARMUP = 'warmup'
+    SPECULATIVE = 'speculative'
+    # Share of the bucket and of the daily quota a background call must leave behind
+    RESERVES = {WARMUP: 0.3, SPECULATIVE: 0.5}
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS quota (
+            name TEXT PRIMARY KEY,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            quota_left REAL,
+            quota_day TEXT
+        );
+    '''
+
+    def __init__(self, path, daily_quota, burst, name='spoonacular'):
+        self.db = SharedDatabase(path, self.SCHEMA)
+        self.daily_quota = daily_quota
+        self.burst = burst
+        self.rate = daily_quota / 86400
+        self.name = name
+
+    @property
+    def enabled(self):
+        return self.daily_quota > 0
+
+    @staticmethod
+    def _today():
+        # Spoonacular quotas reset at midnight UTC
+        return datetime.datetime.now(datetime.timezone.utc).date().isoformat()
+
+    def _read(self, conn, now):
+        row = conn.execute(
+            'SELECT tokens, updated_at, quota_left, quota_day FROM quota WHERE name = ?', (self.name,)
+        ).fetchone()
+        if row is None:
+            return self.burst, self.daily_quota
+        tokens, updated_at, quota_left, quota_day = row
+        tokens = min(self.burst, tokens + max(0.0, now - updated_at) * self.rate)
+        # A new day starts with the full quota until Spoonacular says otherwise
+        if quota_left is None or quota_day != self._today():
+            quota_left = self.daily_quota
+        return tokens, quota_left
+
+    def _update(self, fn):
+        """``fn(tokens, quota_left)`` -> ``(result, tokens, quota_left)``, applied in one write transaction"""
+        now = time.time()
+        conn = self.db.connection()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            result, tokens, quota_left = fn(*self._read(conn, now))
+            conn.execute(
+                'INSERT INTO quota (name, tokens, updated_at, quota_left, quota_day) VALUES (?, ?, ?, ?, ?)'
+                ' ON CONFLICT (name) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at,'
+                ' quota_left = excluded.quota_left, quota_day = excluded.quota_day',
+                (self.name, tokens, now, quota_left, self._today())
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    def acquire(self, cost=1.0, priority=INTERACTIVE):
+        """Take ``cost`` points for a call of ``priority``, or raise QuotaExhausted"""
+        if not self.enabled:
+            return
+
+        def take(tokens, quota_left):
+            if priority == self.INTERACTIVE:
+                # Any points left today may go to a user
+                allowed = quota_left > 0
+            else:
+                reserve = self.RESERVES[priority]
+                allowed = (
+                    tokens - cost >= reserve * self.burst
+                    and quota_left - cost >= reserve * self.daily_quota
+                )
+            if allowed:
+                tokens = max(0.0, tokens - cost)
+                quota_left -= cost
+            return allowed, tokens, quota_left
+
+        if not self._update(take):
+            metrics.inc('upstream_shed_total', priority=priority)
+            if priority == self.INTERACTIVE:
+                raise QuotaExhausted("Today's Spoonacular quota is used up")
+            raise QuotaExhausted(f'Spoonacular quota reserved for higher-priority calls (shed {priority} call)')
+
+    def record_response(self, headers, estimated_cost):
+        """Correct the bucket with what Spoonacular says the call cost and has left today"""
+        if not self.enabled:
+            return
+        charged = _header_number(headers, 'X-API-Quota-Request')
+        left = _header_number(headers, 'X-API-Quota-Left')
+        if charged is None and left is None:
+            return
+
+        def reconcile(tokens, quota_left):
+            if charged is not None:
+                tokens = max(0.0, tokens - (charged - estimated_cost))
+            # Spoonacular's own count wins over our running estimate
+            return None, tokens, left if left is not None else quota_left
+
+        self._update(reconcile)
+
+    def remaining(self):
+        """``(bucket tokens, daily points left)`` right now"""
+        return self._read(self.db.connection(), time.time())
+
+class CircuitBreaker:
+    """Stop calling upstream after repeated failures, then probe it again.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    rejects calls for ``reset_timeout`` seconds. The first call after that
+    is let through as a trial: success closes the breaker, failure opens it
+    for another ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                # Half-open: let this call through, hold the rest back
+                self.opened_at = time.monotonic()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class UpstreamClient:
+    """Pooled, keep-alive HTTP client for the Spoonacular API.
+
+    Every call has connect/read timeouts, transient failures (connection
+    errors, timeouts, 429 and 5xx responses) are retried a bounded number of
+    times with jittered exponential backoff, and a circuit breaker fails
+    calls immediately while upstream is down.
+    """
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+    def __init__(self, base_url, api_key, connect_timeout=3.05, read_timeout=10,
+                 retries=2, backoff=0.2, pool_size=10, breaker=None, governor=None):
+        self.base_url = base_url.rstrip('/')
+        self.api_key = api_key
+        self.timeout = (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker()
+        self.governor = governor
+        self._session = None
+        self._session_pid = None
+
+    @property
+    def session(self):
+        # Pooled sockets must not be shared with forked gunicorn workers
+        if self._session is None or self._session_pid != os.getpid():
+            session = requests.Session()
+            # A header rather than ?apiKey=, so the key never ends up in
+            # URLs quoted by exception messages and logs
+            session.headers['x-api-key'] = self.api_key
+            adapter = HTTPAdapter(pool_connections=self.pool_size, pool_maxsize=self.pool_size, max_retries=0)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            self._session = session
+            self._session_pid = os.getpid()
+        return self._session
+
+    def _sleep_before_retry(self, attempt):
+        time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def endpoint_label(path):
+        # '/recipes/716429/information' -> '/recipes/{id}/information'
+        return re.sub(r'/\d+(?=/|$)', '/{id}', path)
+
+    def get(self, path, params=None, priority=QuotaGovernor.INTERACTIVE, cost=1.0):
+        """GET ``path`` (the API key goes in a header); returns the final response.
+
+        ``cost`` is the expected quota points, charged to the governor at
+        ``priority`` before the call and corrected from the response.
+        """
+        endpoint = self.endpoint_label(path)
+        if not self.breaker.allow():
+            metrics.inc('upstream_errors_total', endpoint=endpoint, kind='circuit_open')
+            raise UpstreamUnavailable('Spoonacular is unavailable (circuit open)')
+        if self.governor is not None:
+            self.governor.acquire(cost, priority)
+
+        with metrics.timer('upstream_request_duration_seconds', endpoint=endpoint):
+            response = self._get_with_retries(path, endpoint, params or {})
+        if self.governor is not None:
+            self.governor.record_response(response.headers, cost)
+        return response
+
+    def _get_with_retries(self, path, endpoint, params):
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.get(f'{self.base_url}{path}', params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc('upstream_errors_total', endpoint=endpoint, kind='timeout' if isinstance(e, requests.Timeout) else 'connection')
+                if attempt == self.retries:
+                    self.breaker.record_failure()
+                    raise
+            else:
+                metrics.inc('upstream_requests_total', endpoint=endpoint, status=str(response.status_code))
+                if response.status_code not in self.RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                metrics.inc('upstream_errors_total', endpoint=endpoint, kind=f'http_{response.status_code}')
+                if attempt == self.retries:
+                    self.breaker.record_failure()
+                    return response
+            self._sleep_before_retry(attempt)
+
+metrics.add_collector(lambda: [('upstream_circuit_open', {}, 1 if spoonacular.breaker.is_open else 0)])
+
+# Spoonacular's free plan allows 150 points a day; 0 turns the governor off
+UPSTREAM_DAILY_QUOTA = float(os.environ.get('UPSTREAM_DAILY_QUOTA', 150))
+
+quota_governor = QuotaGovernor(
+    os.environ.get('QUOTA_DB_PATH') or os.path.join(DATA_DIR, 'quota.sqlite3'),
+    daily_quota=UPSTREAM_DAILY_QUOTA,
+    burst=float(os.environ.get('UPSTREAM_BURST') or max(10.0, UPSTREAM_DAILY_QUOTA / 10))
+)
+
+metrics.describe('upstream_shed_total', 'counter', 'Spoonacular calls refused by the quota governor, by priority')
+metrics.describe('upstream_quota_tokens', 'gauge', 'Quota points in the shared token bucket')
+metrics.describe('upstream_quota_left', 'gauge', 'Daily quota points left, as last reported by Spoonacular or counted since')
+
+def _quota_metrics():
+    if not quota_governor.enabled:
+        return []
+    tokens, quota_left = quota_governor.remaining()
+    return [('upstream_quota_tokens', {}, round(tokens, 3)), ('upstream_quota_left', {}, quota_left)]
+
+metrics.add_collector(_quota_metrics)
+
+spoonacular = UpstreamClient(
+    SPOONACULAR_BASE_URL,
+    SPOONACULAR_API_KEY,
+    connect_timeout=float(os.environ.get('UPSTREAM_CONNECT_TIMEOUT', 3.05)),
+    read_timeout=float(os.environ.get('UPSTREAM_READ_TIMEOUT', 10)),
+    retries=int(os.environ.get('UPSTREAM_RETRIES', 2)),
+    pool_size=int(os.environ.get('UPSTREAM_POOL_SIZE', 10)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.environ.get('UPSTREAM_BREAKER_THRESHOLD', 5)),
+        reset_timeout=float(os.environ.get('UPSTREAM_BREAKER_RESET', 30))
+    ),
+    governor=quota_governor
+)
+
+# Nutrition field in our API -> nutrient name in Spoonacular payloads
+SPOONACULAR_NUTRIENTS = {
+    'calories': 'Calories',
+    'protein': 'Protein',
+    'fat': 'Fat',
+    'carbs': 'Carbohydrates',
+    'fiber': 'Fiber',
+    'sugar': 'Sugar',
+    'sodium': 'Sodium',
+    'cholesterol': 'Cholesterol',
+    'saturated_fat': 'Saturated Fat'
+}
+
+# Fields extracted from upstream recipes, e.g. NUTRITION_FIELDS=calories,protein,fat,carbs,fiber,sugar
+NUTRITION_FIELDS = tuple(
+    field for field in os.environ.get('NUTRITION_FIELDS', 'calories,protein,fat,carbs').split(',')
+    if field in SPOONACULAR_NUTRIENTS
+)
+
+class NutrientBatch:
+    """Nutrient amounts for many upstream items, stored column by column.
+
+    Each item's nutrient list is walked once into a name -> amount map, and
+    the requested fields are appended to one compact float array per field.
+    """
+
+    __slots__ = ('fields', 'columns')
+
+    def __init__(self, fields=NUTRITION_FIELDS):
+        self.fields = fields
+        self.columns = {field: array('d') for field in fields}
+
+    @classmethod
+    def from_payloads(cls, payloads, fields=NUTRITION_FIELDS):
+        batch = cls(fields)
+        for payload in payloads:
+            batch.append(payload)
+        return batch
+
+    def append(self, payload):
+        """Add the ``nutrients`` of one recipe payload (under ``nutrition``, or
+        top-level in a nutrition widget); missing nutrients count as 0"""
+        nutrients = (payload.get('nutrition') or payload).get('nutrients') or []
+        amounts = {nutrient.get('name'): nutrient.get('amount') or 0 for nutrient in nutrients}
+        for field in self.fields:
+            self.columns[field].append(amounts.get(SPOONACULAR_NUTRIENTS[field], 0))
+
+    def __len__(self):
+        return len(self.columns[self.fields[0]]) if self.fields else 0
+
+    def row(self, position):
+        return {field: self.columns[field][position] for field in self.fields}
+
+    def rows(self):
+        return [self.row(position) for position in range(len(self))]
+
+def extract_nutrition(payload, fields=NUTRITION_FIELDS):
+    """Nutrition of a single recipe payload to match frontend expectations"""
+    return NutrientBatch.from_payloads([payload], fields).row(0)
+
+class CacheBackend(abc.ABC):
+    """Storage interface behind ResponseCache.
+
+    Values must be JSON-serializable so that a shared backend can hold them
+    for every worker; ``get`` returns ``None`` for a missing or expired key.
+    """
+
+    @abc.abstractmethod
+    def get(self, key):
+        """The value stored under ``key``, or ``None``"""
+
+    @abc.abstractmethod
+    def set(self, key, value, ttl):
+        """Store ``value`` under ``key`` for ``ttl`` seconds"""
+
+    @abc.abstractmethod
+    def delete(self, key):
+        """Forget ``key`` if it is stored"""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Forget every key"""
+
+class MemoryCache(CacheBackend):
+    """Bounded in-process cache with per-entry TTL and LRU eviction"""
+
+    def __init__(self, maxsize=1024):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+class SQLiteCache(CacheBackend):
+    """Cache backend stored in a WAL-mode SQLite file shared by all workers.
+
+    Eviction is approximately LRU: the access time is only refreshed once a
+    minute per entry to keep reads from turning into writes, and the size
+    bound is enforced every ``EVICT_EVERY`` writes rather than on each one.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS cache (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at);
+    '''
+    TOUCH_INTERVAL = 60
+    EVICT_EVERY = 64
+
+    def __init__(self, path, maxsize=10000):
+        self.db = SharedDatabase(path, self.SCHEMA)
+        self.maxsize = maxsize
+        self._writes = 0
+
+    def get(self, key):
+        conn = self.db.connection()
+        row = conn.execute('SELECT value, expires_at, accessed_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            conn.execute('DELETE FROM cache WHERE key = ? AND expires_at <= ?', (key, now))
+            return None
+        if now - accessed_at > self.TOUCH_INTERVAL:
+            conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        conn = self.db.connection()
+        now = time.time()
+        conn.execute(
+            'INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)',
+            (key, json.dumps(value), now + ttl, now)
+        )
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones above ``maxsize``"""
+        conn = self.db.connection()
+        conn.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),))
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)',
+            (self.maxsize,)
+        )
+
+    def delete(self, key):
+        self.db.connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def clear(self):
+        self.db.connection().execute('DELETE FROM cache')
+
+class ContentStore(CacheBackend):
+    """Content-addressed cache backend in a SQLite file shared by all workers.
+
+    Each distinct value is stored once as a blob named by the SHA-256 of its
+    canonical JSON, and keys only point at a blob, so entries with the same
+    value share it and rewriting an unchanged value adds nothing. Entries
+    expire by age (their TTL); past ``max_bytes`` the least recently used
+    ones go, and blobs nothing points at any more are dropped with them.
+    Like SQLiteCache, access times are refreshed at most once a minute and
+    the bounds are enforced every ``EVICT_EVERY`` writes. Triggers keep
+    running totals, so checking the size never scans the tables.
+    """
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS blobs (
+            digest TEXT PRIMARY KEY,
+            value TEXT NOT NULL,
+            size INTEGER NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS entries (
+            key TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at);
+        CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            entries INTEGER NOT NULL,
+            blobs INTEGER NOT NULL,
+            bytes INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO totals (id, entries, blobs, bytes) VALUES (0, 0, 0, 0);
+        CREATE TRIGGER IF NOT EXISTS blobs_added AFTER INSERT ON blobs BEGIN
+            UPDATE totals SET blobs = blobs + 1, bytes = bytes + NEW.size;
+        END;
+        CREATE TRIGGER IF NOT EXISTS blobs_removed AFTER DELETE ON blobs BEGIN
+            UPDATE totals SET blobs = blobs - 1, bytes = bytes - OLD.size;
+        END;
+        -- An entry row costs its key plus roughly 48 bytes of digest and timestamps
+        CREATE TRIGGER IF NOT EXISTS entries_added AFTER INSERT ON entries BEGIN
+            UPDATE totals SET entries = entries + 1, bytes = bytes + LENGTH(NEW.key) + 48;
+        END;
+        CREATE TRIGGER IF NOT EXISTS entries_removed AFTER DELETE ON entries BEGIN
+            UPDATE totals SET entries = entries - 1, bytes = bytes - LENGTH(OLD.key) - 48;
+        END;
+    '''
+    TOUCH_INTERVAL = 60
+    EVICT_EVERY = 64
+
+    def __init__(self, path, max_bytes=32 << 20):
+        self.db = SharedDatabase(path, self.SCHEMA)
+        self.max_bytes = max_bytes
+        self._writes = 0
+
+    @staticmethod
+    def digest(data):
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()[:32]
+
+    def get(self, key):
+        conn = self.db.connection()
+        row = conn.execute(
+            'SELECT blobs.value, entries.expires_at, entries.accessed_at'
+            ' FROM entries JOIN blobs ON blobs.digest = entries.digest WHERE entries.key = ?',
+            (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            conn.execute('DELETE FROM entries WHERE key = ? AND expires_at <= ?', (key, now))
+            return None
+        if now - accessed_at > self.TOUCH_INTERVAL:
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return json.loads(value)
+
+    def set(self, key, value, ttl):
+        data = json.dumps(value, sort_keys=True, separators=(',', ':'))
+        digest = self.digest(data)
+        now = time.time()
+        conn = self.db.connection()
+        # One transaction, so eviction in another worker can't drop the blob
+        # between writing it and pointing the entry at it
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'INSERT OR IGNORE INTO blobs (digest, value, size) VALUES (?, ?, ?)',
+                (digest, data, len(data.encode('utf-8')))
+            )
+            # An upsert rather than INSERT OR REPLACE, whose implicit delete
+            # would skip the entries_removed trigger
+            conn.execute(
+                'INSERT INTO entries (key, digest, expires_at, accessed_at) VALUES (?, ?, ?, ?)'
+                ' ON CONFLICT (key) DO UPDATE SET digest = excluded.digest,'
+                ' expires_at = excluded.expires_at, accessed_at = excluded.accessed_at',
+                (key, digest, now + ttl, now)
+            )
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            raise
+        self._writes += 1
+        if self._writes % self.EVICT_EVERY == 0:
+            self.evict()
+
+    def usage(self, conn=None):
+        """``{'entries', 'blobs', 'bytes'}``: what the store holds and its approximate size"""
+        conn = conn or self.db.connection()
+        entries, blobs, size = conn.execute('SELECT entries, blobs, bytes FROM totals').fetchone()
+        return {'entries': entries, 'blobs': blobs, 'bytes': size}
+
+    def _drop_orphans(self, conn):
+        conn.execute(
+            'DELETE FROM blobs WHERE NOT EXISTS (SELECT 1 FROM entries WHERE entries.digest = blobs.digest)'
+        )
+
+    def evict(self):
+        """Drop expired entries, then the least recently used ones until under ``max_bytes``"""
+        conn = self.db.connection()
+        conn.execute('DELETE FROM entries WHERE expires_at <= ?', (time.time(),))
+        self._drop_orphans(conn)
+        usage = self.usage(conn)
+        while usage['bytes'] > self.max_bytes and usage['entries']:
+            # A tenth at a time: shared blobs only free space once every
+            # entry using them is gone, so the bytes freed per entry vary
+            conn.execute(
+                'DELETE FROM entries WHERE key IN (SELECT key FROM entries ORDER BY accessed_at LIMIT ?)',
+                (max(1, usage['entries'] // 10),)
+            )
+            self._drop_orphans(conn)
+            usage = self.usage(conn)
+
+    def delete(self, key):
+        self.db.connection().execute('DELETE FROM entries WHERE key = ?', (key,))
+
+    def clear(self):
+        conn = self.db.connection()
+        conn.execute('DELETE FROM entries')
+        conn.execute('DELETE FROM blobs')
+
+def make_cache_backend():
+    """Cache backend selected by CACHE_BACKEND: 'sqlite' (shared, default) or 'memory'"""
+    maxsize = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+    if os.environ.get('CACHE_BACKEND', 'sqlite') == 'memory':
+        return MemoryCache(maxsize=maxsize)
+    return SQLiteCache(os.environ.get('CACHE_DB_PATH') or os.path.join(DATA_DIR, 'cache.sqlite3'), maxsize=maxsize)
+
+# One backend for every response cache, namespaced by ResponseCache
+cache_backend = make_cache_backend()
+
+class ResponseCache:
+    """Namespaced cache with hit/miss counters and negative caching.
+
+    Empty results are cached too, but for ``negative_ttl`` seconds only, so
+    queries that find nothing upstream don't hit the API on every request
+    while still picking up new recipes reasonably quickly.
+    """
+
+    def __init__(self, name, backend, ttl, negative_ttl):
+        self.name = name
+        self.backend = backend
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+
+    def _key(self, key):
+        return f'{self.name}:{key}'
+
+    def get(self, key):
+        value = self.backend.get(self._key(key))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if not value:
+                self.negative_hits += 1
+        return value
+
+    def peek(self, key):
+        """Like ``get`` but without touching the counters, for background jobs"""
+        return self.backend.get(self._key(key))
+
+    def set(self, key, value):
+        self.backend.set(self._key(key), value, self.ttl if value else self.negative_ttl)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'negative_hits': self.negative_hits
+        }
+
+def normalize_query(query):
+    """Cache key for a search query: case- and whitespace-insensitive"""
+    return ' '.join(query.lower().split())
+
+search_cache = ResponseCache(
+    'search',
+    cache_backend,
+    ttl=int(os.environ.get('SEARCH_CACHE_TTL', 3600)),
+    negative_ttl=int(os.environ.get('SEARCH_CACHE_NEGATIVE_TTL', 300))
+)
+
+# Recipe nutrition rarely changes, so it is kept much longer than searches,
+# in its own store that survives restarts and redeploys (put DATA_DIR or
+# NUTRITION_STORE_PATH on a persistent disk). Every worker shares it, so a
+# recipe is fetched at most once per TTL per deployment.
+NUTRITION_CACHE_TTL = int(os.environ.get('NUTRITION_CACHE_TTL', 7 * 86400))
+
+def make_nutrition_backend():
+    """The ContentStore for recipe nutrition, or the shared cache backend with CACHE_BACKEND=memory"""
+    if os.environ.get('CACHE_BACKEND', 'sqlite') == 'memory':
+        return cache_backend
+    return ContentStore(
+        os.environ.get('NUTRITION_STORE_PATH') or os.path.join(DATA_DIR, 'nutrition.sqlite3'),
+        max_bytes=int(os.environ.get('NUTRITION_STORE_MAX_BYTES', 32 << 20))
+    )
+
+nutrition_store = make_nutrition_backend()
+nutrition_cache = ResponseCache('nutrition', nutrition_store, ttl=NUTRITION_CACHE_TTL, negative_ttl=NUTRITION_CACHE_TTL)
+
+metrics.add_collector(lambda: [
+    ('cache_requests_total', {'cache': cache.name, 'result': result}, count)
+    for cache in (search_cache, nutrition_cache)
+    for result, count in (('hit', cache.hits), ('miss', cache.misses))
+])
+
+metrics.describe('nutrition_store_bytes', 'gauge', 'Approximate size of the recipe nutrition store')
+metrics.describe('nutrition_store_entries', 'gauge', 'Recipes in the nutrition store')
+
+def _nutrition_store_metrics():
+    if not isinstance(nutrition_store, ContentStore):
+        return []
+    usage = nutrition_store.usage()
+    return [('nutrition_store_bytes', {}, usage['bytes']), ('nutrition_store_entries', {}, usage['entries'])]
+
+metrics.add_collector(_nutrition_store_metrics)
+
+metrics.describe('upstream_coalesced_total', 'counter', 'Lookups that joined an identical in-flight Spoonacular call instead of making their own')
+
+class _FlightCall:
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesce concurrent identical upstream lookups into one call.
+
+    The first thread to ask for a key makes the call; threads asking for
+    the same key while it is in flight wait and share its result (or its
+    exception). Nothing is remembered once the call finishes, that is the
+    caches' job.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn, *args):
+        """``fn(*args)``, or the result of the identical call already in flight"""
+        return self.do_many([key], lambda keys: {key: fn(*args)})[key]
+
+    def do_many(self, keys, fn):
+        """Batch form: ``fn(keys)`` returns ``{key: value}`` and is only called
+        for the keys nobody else is fetching; the rest are waited for.
+        Returns the values found for ``keys``.
+        """
+        owned, joined = [], []
+        with self._lock:
+            for key in keys:
+                call = self._calls.get(key)
+                if call is None:
+                    owned.append(key)
+                elif call not in joined:
+                    joined.append(call)
+            if owned:
+                mine = _FlightCall()
+                for key in owned:
+                    self._calls[key] = mine
+        if joined:
+            metrics.inc('upstream_coalesced_total', amount=len(keys) - len(owned), flight=self.name)
+
+        results = {}
+        if owned:
+            try:
+                mine.result = fn(owned)
+            except Exception as e:
+                mine.error = e
+                raise
+            finally:
+                with self._lock:
+                    for key in owned:
+                        del self._calls[key]
+                mine.done.set()
+            results.update(mine.result)
+        for call in joined:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            results.update(call.result)
+        return {key: results[key] for key in keys if key in results}
+
+class AsyncSingleFlight:
+    """``SingleFlight`` for coroutines on one event loop.
+
+    The shared call runs as its own task and waiters are shielded, so a
+    caller that gives up (e.g. on the search latency budget) does not
+    cancel the call for everyone else.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self._tasks = {}
+
+    async def do(self, key, fn, *args):
+        async def call(keys):
+            return {key: await fn(*args)}
+        return (await self.do_many([key], call))[key]
+
+    async def do_many(self, keys, fn):
+        owned = [key for key in keys if key not in self._tasks]
+        if len(owned) < len(keys):
+            metrics.inc('upstream_coalesced_total', amount=len(keys) - len(owned), flight=self.name)
+        if owned:
+            task = asyncio.ensure_future(fn(owned))
+            for key in owned:
+                self._tasks[key] = task
+            task.add_done_callback(lambda task: self._forget(owned, task))
+
+        results = {}
+        for task in {id(self._tasks[key]): self._tasks[key] for key in keys}.values():
+            results.update(await asyncio.shield(task))
+        return {key: results[key] for key in keys if key in results}
+
+    def _forget(self, keys, task):
+        for key in keys:
+            if self._tasks.get(key) is task:
+                del self._tasks[key]
+
+# Keyed by (priority, normalized query) and (priority, recipe id), shared by
+# single and batch lookups. The priority keeps a user request from joining a
+# warm-up or prefetch call that the quota governor may shed.
+search_flight = SingleFlight('search')
+nutrition_flight = SingleFlight('nutrition')
 
-# For production deployment, serve React static files
-static_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'build')
-app = Flask(__name__, static_folder=static_folder, static_url_path='')
+class QueryStats:
+    """How often each search query is made, whether it was served warm, and
+    which foods searches returned (the titles ``/api/suggest`` offers).
 
-print(f"Static folder path: {static_folder}")
-print(f"Static folder exists: {os.path.exists(static_folder)}")
-if os.path.exists(static_folder):
-    print(f"Files in static folder: {os.listdir(static_folder)}")
-    # Check if static/js directory exists
-    js_folder = os.path.join(static_folder, 'static', 'js')
-    if os.path.exists(js_folder):
-        print(f"JS files in static/js: {os.listdir(js_folder)}")
-    else:
-        print("static/js directory does not exist!")
-else:
-    # Try alternative path for production deployment
-    alternative_static = os.path.join(os.getcwd(), 'frontend', 'build')
-    print(f"Trying alternative path: {alternative_static}")
-    if os.path.exists(alternative_static):
-        app.static_folder = alternative_static
-        print(f"Using alternative static folder: {alternative_static}")
-    else:
-        print("No static folder found - frontend may not be available")
+    Shared by all workers through SQLite. Counts are buffered in memory and
+    flushed at most every ``FLUSH_INTERVAL`` seconds, so the search path
+    does not write to disk on every request.
+    """
 
-# Configure CORS for production
-if os.environ.get('FLASK_ENV') == 'production':
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
-else:
-    CORS(app, resources={
-        r"/api/*": {
-            "origins": ["http://localhost:3000"],
-            "methods": ["GET", "POST", "OPTIONS"],
-            "allow_headers": ["Content-Type"]
-        }
-    })
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS query_stats (
+            query TEXT PRIMARY KEY,
+            searches INTEGER NOT NULL,
+            cold INTEGER NOT NULL,
+            warm INTEGER NOT NULL,
+            last_seen REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS query_stats_last_seen ON query_stats (last_seen);
+        CREATE TABLE IF NOT EXISTS seen_titles (
+            food_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            served INTEGER NOT NULL,
+            last_seen REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS seen_titles_served ON seen_titles (served);
+        CREATE INDEX IF NOT EXISTS seen_titles_last_seen ON seen_titles (last_seen);
+        CREATE TABLE IF NOT EXISTS leases (
+            name TEXT PRIMARY KEY,
+            holder TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    '''
+    FLUSH_INTERVAL = 10
 
-# Temporary storage for food logs (replace with database in production)
-daily_food_log = []
-
-# Indian foods database for fallback when Spoonacular API doesn't have results
-INDIAN_FOODS_DB = {
-    # South Indian Breakfast & Snacks
-    'dosa': {
-        'id': 'indian_dosa_001',
-        'title': 'Plain Dosa',
-        'image': 'https://images.unsplash.com/photo-1630409351151-b80b322c3d43?w=300&q=80',
-        'nutrition': {'calories': 168, 'protein': 4, 'fat': 3, 'carbs': 32}
-    },
-    'masala dosa': {
-        'id': 'indian_masala_dosa_001',
-        'title': 'Masala Dosa',
-        'image': 'https://images.unsplash.com/photo-1668236543090-82eba5ee5976?w=300&q=80',
-        'nutrition': {'calories': 285, 'protein': 6, 'fat': 8, 'carbs': 48}
-    },
-    'rava dosa': {
-        'id': 'indian_rava_dosa_001',
-        'title': 'Rava Dosa',
-        'image': 'https://images.unsplash.com/photo-1630409351072-b80b322c3d43?w=300&q=80',
-        'nutrition': {'calories': 195, 'protein': 5, 'fat': 4, 'carbs': 36}
-    },
-    'idli': {
-        'id': 'indian_idli_001',
-        'title': 'Idli (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1546833999-b9f581a1996d?w=300&q=80',
-        'nutrition': {'calories': 78, 'protein': 3, 'fat': 1, 'carbs': 16}
-    },
-    'uttapam': {
-        'id': 'indian_uttapam_001',
-        'title': 'Vegetable Uttapam',
-        'image': 'https://images.unsplash.com/photo-1630409351121-19762d6e3c5d?w=300&q=80',
-        'nutrition': {'calories': 195, 'protein': 5, 'fat': 4, 'carbs': 35}
-    },
-    'medu vada': {
-        'id': 'indian_medu_vada_001',
-        'title': 'Medu Vada (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1630409351134-b80b322c3d43?w=300&q=80',
-        'nutrition': {'calories': 185, 'protein': 6, 'fat': 8, 'carbs': 24}
-    },
-    'rava idli': {
-        'id': 'indian_rava_idli_001',
-        'title': 'Rava Idli (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1626074353765-517a681e40be?w=300&q=80',
-        'nutrition': {'calories': 95, 'protein': 3, 'fat': 2, 'carbs': 18}
-    },
-    'appam': {
-        'id': 'indian_appam_001',
-        'title': 'Appam (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1630409351072-b80b322c3d43?w=300&q=80',
-        'nutrition': {'calories': 120, 'protein': 2, 'fat': 1, 'carbs': 26}
-    },
-    
-    # North Indian Street Food & Snacks
-    'samosa': {
-        'id': 'indian_samosa_001',
-        'title': 'Vegetable Samosa',
-        'image': 'https://images.unsplash.com/photo-1565958011703-44f9829ba187?w=300&q=80',
-        'nutrition': {'calories': 262, 'protein': 4, 'fat': 17, 'carbs': 24}
-    },
-    'kachori': {
-        'id': 'indian_kachori_001',
-        'title': 'Dal Kachori',
-        'image': 'https://images.unsplash.com/photo-1666286332363-5caa95e25b60?w=300&q=80',
-        'nutrition': {'calories': 186, 'protein': 5, 'fat': 8, 'carbs': 25}
-    },
-    'aloo tikki': {
-        'id': 'indian_aloo_tikki_001',
-        'title': 'Aloo Tikki',
-        'image': 'https://images.unsplash.com/photo-1606491956689-2ea866880c84?w=300&q=80',
-        'nutrition': {'calories': 165, 'protein': 3, 'fat': 7, 'carbs': 24}
-    },
-    'bhel puri': {
-        'id': 'indian_bhel_puri_001',
-        'title': 'Bhel Puri',
-        'image': 'https://images.unsplash.com/photo-1626074353765-517a681e40be?w=300&q=80',
-        'nutrition': {'calories': 220, 'protein': 6, 'fat': 8, 'carbs': 32}
-    },
-    'sev puri': {
-        'id': 'indian_sev_puri_001',
-        'title': 'Sev Puri',
-        'image': 'https://images.unsplash.com/photo-1601050690117-94f5f6fa7fa8?w=300&q=80',
-        'nutrition': {'calories': 180, 'protein': 4, 'fat': 8, 'carbs': 24}
-    },
-    'pani puri': {
-        'id': 'indian_pani_puri_001',
-        'title': 'Pani Puri (6 pieces)',
-        'image': 'https://images.unsplash.com/photo-1606491956689-2ea866880c84?w=300&q=80',
-        'nutrition': {'calories': 120, 'protein': 3, 'fat': 2, 'carbs': 24}
-    },
-    'dahi puri': {
-        'id': 'indian_dahi_puri_001',
-        'title': 'Dahi Puri',
-        'image': 'https://images.unsplash.com/photo-1601050690117-94f5f6fa7fa8?w=300&q=80',
-        'nutrition': {'calories': 150, 'protein': 4, 'fat': 5, 'carbs': 23}
-    },
-    'pav bhaji': {
-        'id': 'indian_pav_bhaji_001',
-        'title': 'Pav Bhaji',
-        'image': 'https://images.unsplash.com/photo-1606471679504-b6894fe3ad38?w=300&q=80',
-        'nutrition': {'calories': 400, 'protein': 12, 'fat': 18, 'carbs': 52}
-    },
-    'vada pav': {
-        'id': 'indian_vada_pav_001',
-        'title': 'Vada Pav',
-        'image': 'https://images.unsplash.com/photo-1606491956689-2ea866880c84?w=300&q=80',
-        'nutrition': {'calories': 290, 'protein': 7, 'fat': 12, 'carbs': 40}
-    },
-    'misal pav': {
-        'id': 'indian_misal_pav_001',
-        'title': 'Misal Pav',
-        'image': 'https://images.unsplash.com/photo-1626074353765-517a681e40be?w=300&q=80',
-        'nutrition': {'calories': 320, 'protein': 12, 'fat': 14, 'carbs': 42}
-    },
-    
-    # Gujarati & Western Indian
-    'dhokla': {
-        'id': 'indian_dhokla_001',
-        'title': 'Dhokla (4 pieces)',
-        'image': 'https://images.unsplash.com/photo-1601050690117-94f5f6fa7fa8?w=300&q=80',
-        'nutrition': {'calories': 160, 'protein': 6, 'fat': 3, 'carbs': 28}
-    },
-    'khandvi': {
-        'id': 'indian_khandvi_001',
-        'title': 'Khandvi',
-        'image': 'https://images.unsplash.com/photo-1606491956689-2ea866880c84?w=300&q=80',
-        'nutrition': {'calories': 140, 'protein': 5, 'fat': 4, 'carbs': 22}
-    },
-    'thepla': {
-        'id': 'indian_thepla_001',
-        'title': 'Thepla (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1555939594-58d7cb561ad1?w=300&q=80',
-        'nutrition': {'calories': 180, 'protein': 5, 'fat': 6, 'carbs': 28}
-    },
-    'fafda': {
-        'id': 'indian_fafda_001',
-        'title': 'Fafda with Jalebi',
-        'image': 'https://images.unsplash.com/photo-1599599810769-bcde5a160d32?w=300&q=80',
-        'nutrition': {'calories': 280, 'protein': 6, 'fat': 12, 'carbs': 38}
-    },
-    
-    # Breakfast Items
-    'poha': {
-        'id': 'indian_poha_001',
-        'title': 'Poha',
-        'image': 'https://images.unsplash.com/photo-1565958011703-44f9829ba187?w=300&q=80',
-        'nutrition': {'calories': 180, 'protein': 4, 'fat': 6, 'carbs': 28}
-    },
-    'upma': {
-        'id': 'indian_upma_001',
-        'title': 'Upma',
-        'image': 'https://images.unsplash.com/photo-1565958011713-44f9829ba187?w=300&q=80',
-        'nutrition': {'calories': 200, 'protein': 5, 'fat': 7, 'carbs': 30}
-    },
-    'aloo paratha': {
-        'id': 'indian_aloo_paratha_001',
-        'title': 'Aloo Paratha',
-        'image': 'https://images.unsplash.com/photo-1596797038530-2c107229654b?w=300&q=80',
-        'nutrition': {'calories': 320, 'protein': 8, 'fat': 12, 'carbs': 46}
-    },
-    'gobi paratha': {
-        'id': 'indian_gobi_paratha_001',
-        'title': 'Gobi Paratha',
-        'image': 'https://images.unsplash.com/photo-1596797038530-2c107229654b?w=300&q=80',
-        'nutrition': {'calories': 295, 'protein': 7, 'fat': 11, 'carbs': 42}
-    },
-    'paneer paratha': {
-        'id': 'indian_paneer_paratha_001',
-        'title': 'Paneer Paratha',
-        'image': 'https://images.unsplash.com/photo-1596797038530-2c107229654b?w=300&q=80',
-        'nutrition': {'calories': 350, 'protein': 12, 'fat': 15, 'carbs': 44}
-    },
-    'methi paratha': {
-        'id': 'indian_methi_paratha_001',
-        'title': 'Methi Paratha',
-        'image': 'https://images.unsplash.com/photo-1596797038530-2c107229654b?w=300&q=80',
-        'nutrition': {'calories': 280, 'protein': 8, 'fat': 10, 'carbs': 40}
-    },
-    
-    # Main Courses & Rice Dishes
-    'biryani': {
-        'id': 'indian_biryani_001',
-        'title': 'Vegetable Biryani',
-        'image': 'https://images.unsplash.com/photo-1563379091339-03246963d61a?w=300&q=80',
-        'nutrition': {'calories': 420, 'protein': 12, 'fat': 15, 'carbs': 62}
-    },
-    'pulao': {
-        'id': 'indian_pulao_001',
-        'title': 'Vegetable Pulao',
-        'image': 'https://images.unsplash.com/photo-1563379091359-03246963d61a?w=300&q=80',
-        'nutrition': {'calories': 320, 'protein': 8, 'fat': 10, 'carbs': 52}
-    },
-    'jeera rice': {
-        'id': 'indian_jeera_rice_001',
-        'title': 'Jeera Rice',
-        'image': 'https://images.unsplash.com/photo-1563379091369-03246963d61a?w=300&q=80',
-        'nutrition': {'calories': 280, 'protein': 6, 'fat': 8, 'carbs': 48}
-    },
-    
-    # Dal & Curry Dishes
-    'dal rice': {
-        'id': 'indian_dal_rice_001',
-        'title': 'Dal Rice',
-        'image': 'https://images.unsplash.com/photo-1505253716362-afaea1d3d1af?w=300&q=80',
-        'nutrition': {'calories': 290, 'protein': 12, 'fat': 4, 'carbs': 52}
-    },
-    'rajma': {
-        'id': 'indian_rajma_001',
-        'title': 'Rajma Rice',
-        'image': 'https://images.unsplash.com/photo-1505253716362-afaea1d3d1af?w=300&q=80',
-        'nutrition': {'calories': 350, 'protein': 14, 'fat': 8, 'carbs': 58}
-    },
-    'chole bhature': {
-        'id': 'indian_chole_bhature_001',
-        'title': 'Chole Bhature',
-        'image': 'https://images.unsplash.com/photo-1505253716362-afaea1d3d1af?w=300&q=80',
-        'nutrition': {'calories': 485, 'protein': 16, 'fat': 22, 'carbs': 58}
-    },
-    'dal makhani': {
-        'id': 'indian_dal_makhani_001',
-        'title': 'Dal Makhani',
-        'image': 'https://images.unsplash.com/photo-1505253716362-afaea1d3d1af?w=300&q=80',
-        'nutrition': {'calories': 280, 'protein': 12, 'fat': 12, 'carbs': 32}
-    },
-    'paneer butter masala': {
-        'id': 'indian_paneer_butter_masala_001',
-        'title': 'Paneer Butter Masala',
-        'image': 'https://images.unsplash.com/photo-1631452180519-c014fe946bc7?w=300&q=80',
-        'nutrition': {'calories': 320, 'protein': 15, 'fat': 18, 'carbs': 25}
-    },
-    'palak paneer': {
-        'id': 'indian_palak_paneer_001',
-        'title': 'Palak Paneer',
-        'image': 'https://images.unsplash.com/photo-1631452180529-c014fe946bc7?w=300&q=80',
-        'nutrition': {'calories': 285, 'protein': 14, 'fat': 16, 'carbs': 22}
-    },
-    'kadhi pakora': {
-        'id': 'indian_kadhi_pakora_001',
-        'title': 'Kadhi Pakora',
-        'image': 'https://images.unsplash.com/photo-1505253716362-afaea1d3d1af?w=300&q=80',
-        'nutrition': {'calories': 250, 'protein': 8, 'fat': 12, 'carbs': 28}
-    },
-    
-    # Bread Items
-    'roti': {
-        'id': 'indian_roti_001',
-        'title': 'Roti (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1555939594-58d7cb561ad1?w=300&q=80',
-        'nutrition': {'calories': 140, 'protein': 4, 'fat': 1, 'carbs': 28}
-    },
-    'naan': {
-        'id': 'indian_naan_001',
-        'title': 'Plain Naan',
-        'image': 'https://images.unsplash.com/photo-1555939594-58d7cb561ad1?w=300&q=80',
-        'nutrition': {'calories': 285, 'protein': 8, 'fat': 9, 'carbs': 42}
-    },
-    'butter naan': {
-        'id': 'indian_butter_naan_001',
-        'title': 'Butter Naan',
-        'image': 'https://images.unsplash.com/photo-1555939594-58d7cb561ad1?w=300&q=80',
-        'nutrition': {'calories': 320, 'protein': 8, 'fat': 12, 'carbs': 42}
-    },
-    'garlic naan': {
-        'id': 'indian_garlic_naan_001',
-        'title': 'Garlic Naan',
-        'image': 'https://images.unsplash.com/photo-1555939594-58d7cb561ad1?w=300&q=80',
-        'nutrition': {'calories': 295, 'protein': 8, 'fat': 10, 'carbs': 42}
-    },
-    'puri': {
-        'id': 'indian_puri_001',
-        'title': 'Puri (4 pieces)',
-        'image': 'https://images.unsplash.com/photo-1599938870781-b5c6f8c5a3bb?w=300&q=80',
-        'nutrition': {'calories': 340, 'protein': 8, 'fat': 14, 'carbs': 48}
-    },
-    'bhatura': {
-        'id': 'indian_bhatura_001',
-        'title': 'Bhatura (1 piece)',
-        'image': 'https://images.unsplash.com/photo-1599938870791-b5c6f8c5a3bb?w=300&q=80',
-        'nutrition': {'calories': 280, 'protein': 6, 'fat': 12, 'carbs': 38}
-    },
+    def __init__(self, path):
+        self.db = SharedDatabase(path, self.SCHEMA)
+        self._pending = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def record(self, query, warm):
+        with self._lock:
+            counts = self._pending.setdefault(query, [0, 0])
+            counts[1 if warm else 0] += 1
+            due = time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def record_served(self, results):
+        """Count each search result shown to a user"""
+        with self._lock:
+            for result in results:
+                entry = self._served.setdefault(str(result['id']), [result['title'], 0])
+                entry[1] += 1
+            due = time.monotonic() - self._flushed_at >= self.FLUSH_INTERVAL
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            served, self._served = self._served, {}
+            self._flushed_at = time.monotonic()
+        if not pending and not served:
+            return
+        now = time.time()
+        conn = self.db.connection()
+        conn.executemany(
+            'INSERT INTO query_stats (query, searches, cold, warm, last_seen) VALUES (?, ?, ?, ?, ?)'
+            ' ON CONFLICT (query) DO UPDATE SET searches = searches + excluded.searches,'
+            ' cold = cold + excluded.cold, warm = warm + excluded.warm, last_seen = excluded.last_seen',
+            [(query, cold + warm, cold, warm, now) for query, (cold, warm) in pending.items()]
+        )
+        conn.executemany(
+            'INSERT INTO seen_titles (food_id, title, served, last_seen) VALUES (?, ?, ?, ?)'
+            ' ON CONFLICT (food_id) DO UPDATE SET title = excluded.title,'
+            ' served = served + excluded.served, last_seen = excluded.last_seen',
+            [(food_id, title, count, now) for food_id, (title, count) in served.items()]
+        )
+
+    def seen_titles(self, limit):
+        """``(food id, title, times served)`` for the most served search results"""
+        return self.db.connection().execute(
+            'SELECT food_id, title, served FROM seen_titles ORDER BY served DESC LIMIT ?',
+            (limit,)
+        ).fetchall()
+
+    def seen_titles_version(self):
+        """Changes whenever served titles are flushed (by any worker): the latest ``last_seen``"""
+        (version,) = self.db.connection().execute('SELECT MAX(last_seen) FROM seen_titles').fetchone()
+        return version
+
+    def top(self, limit, since):
+        """Most searched queries seen since ``since`` (epoch seconds)"""
+        rows = self.db.connection().execute(
+            'SELECT query, searches, cold, warm FROM query_stats'
+            ' WHERE last_seen >= ? ORDER BY searches DESC LIMIT ?',
+            (since, limit)
+        )
+        return [{'query': query, 'searches': searches, 'cold': cold, 'warm': warm} for query, searches, cold, warm in rows]
+
+    def acquire_lease(self, name, ttl, holder):
+        """Take or renew the named lease for ``ttl`` seconds; False while another holder has it.
+
+        Holders renew well before ``ttl`` runs out, so a lease left behind by
+        a process that died (a redeploy, a recycled worker) frees up within
+        ``ttl`` seconds instead of blocking everyone until it would have ended.
+        """
+        now = time.time()
+        cursor = self.db.connection().execute(
+            'INSERT INTO leases (name, holder, expires_at) VALUES (?, ?, ?)'
+            ' ON CONFLICT (name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at'
+            ' WHERE leases.expires_at <= ? OR leases.holder = excluded.holder',
+            (name, holder, now + ttl, now)
+        )
+        return cursor.rowcount == 1
+
+query_stats = QueryStats(os.environ.get('QUERY_STATS_DB_PATH') or os.path.join(DATA_DIR, 'query_stats.sqlite3'))
+
+def cached_spoonacular_results(query):
+    """Cached complexSearch results for ``query`` or ``None``; the query is counted either way"""
+    cache_key = normalize_query(query)
+    cached = search_cache.get(cache_key)
+    query_stats.record(cache_key, warm=cached is not None)
+    return cached
+
+def fetch_spoonacular_results(query):
+    """Spoonacular complexSearch results for ``query``, sharing the call with concurrent requests for it"""
+    with metrics.timer('stage_duration_seconds', stage='upstream_fetch'):
+        return search_flight.do((QuotaGovernor.INTERACTIVE, normalize_query(query)), refresh_search_cache, query)
+
+# Rough quota points per call, corrected from the response headers:
+# complexSearch is 1 point plus a little per result and per nutrition block
+SEARCH_COST = 1.35
+
+def bulk_nutrition_cost(recipe_ids):
+    return 1 + 0.5 * (len(recipe_ids) - 1)
+
+def search_params(query):
+    """complexSearch parameters for ``query``"""
+    return {
+        'query': query,
+        'number': 10,  # Limit results to 10 items
+        'addNutrition': True
+    }
+
+def search_results_from_payload(query, data):
+    """Our search rows from a complexSearch response body"""
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug('Spoonacular search response', extra={'query': query, 'payload': data})
     
-    # Sweets & Desserts
-    'jalebi': {
-        'id': 'indian_jalebi_001',
-        'title': 'Jalebi',
-        'image': 'https://images.unsplash.com/photo-1599599810769-bcde5a160d32?w=300&q=80',
-        'nutrition': {'calories': 150, 'protein': 1, 'fat': 4, 'carbs': 28}
-    },
-    'imarti': {
-        'id': 'indian_imarti_001',
-        'title': 'Imarti',
-        'image': 'https://images.unsplash.com/photo-1678031487094-8b4fb3b1c0a0?w=300&q=80',
-        'nutrition': {'calories': 165, 'protein': 2, 'fat': 5, 'carbs': 30}
-    },
-    'gulab jamun': {
-        'id': 'indian_gulab_jamun_001',
-        'title': 'Gulab Jamun (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1594736797933-d0901ba2fe65?w=300&q=80',
-        'nutrition': {'calories': 195, 'protein': 3, 'fat': 8, 'carbs': 30}
-    },
-    'rasgulla': {
-        'id': 'indian_rasgulla_001',
-        'title': 'Rasgulla (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1594736797963-d0901ba2fe65?w=300&q=80',
-        'nutrition': {'calories': 106, 'protein': 4, 'fat': 1, 'carbs': 22}
-    },
-    'rasmalai': {
-        'id': 'indian_rasmalai_001',
-        'title': 'Rasmalai (2 pieces)',
-        'image': 'https://images.unsplash.com/photo-1594736797973-d0901ba2fe65?w=300&q=80',
-        'nutrition': {'calories': 180, 'protein': 6, 'fat': 8, 'carbs': 22}
-    },
-    'kheer': {
-        'id': 'indian_kheer_001',
-        'title': 'Rice Kheer',
-        'image': 'https://images.unsplash.com/photo-1578662996442-48f60103fc96?w=300&q=80',
-        'nutrition': {'calories': 165, 'protein': 4, 'fat': 5, 'carbs': 26}
-    },
-    'kulfi': {
-        'id': 'indian_kulfi_001',
-        'title': 'Kulfi',
-        'image': 'https://images.unsplash.com/photo-1578662996442-48f60103fc96?w=300&q=80',
-        'nutrition': {'calories': 155, 'protein': 4, 'fat': 6, 'carbs': 22}
-    },
-    'halwa': {
-        'id': 'indian_halwa_001',
-        'title': 'Carrot Halwa',
-        'image': 'https://images.unsplash.com/photo-1578662996452-48f60103fc96?w=300&q=80',
-        'nutrition': {'calories': 210, 'protein': 4, 'fat': 8, 'carbs': 32}
-    },
-    'laddu': {
-        'id': 'indian_laddu_001',
-        'title': 'Besan Laddu',
-        'image': 'https://images.unsplash.com/photo-1594736797943-d0901ba2fe65?w=300&q=80',
-        'nutrition': {'calories': 185, 'protein': 4, 'fat': 7, 'carbs': 28}
-    },
-    'barfi': {
-        'id': 'indian_barfi_001',
-        'title': 'Kaju Barfi',
-        'image': 'https://images.unsplash.com/photo-1594736797953-d0901ba2fe65?w=300&q=80',
-        'nutrition': {'calories': 165, 'protein': 3, 'fat': 8, 'carbs': 20}
-    },
+    items = data.get('results') or []
+    nutrition = NutrientBatch.from_payloads(items)
+    return [{
+        'id': item['id'],
+        'title': item['title'],
+        'image': item['image'],
+        'nutrition': nutrition.row(position)
+    } for position, item in enumerate(items)]
+
+def refresh_search_cache(query, priority=QuotaGovernor.INTERACTIVE):
+    """Fetch ``query`` from Spoonacular and store the answer in the search cache"""
+    response = spoonacular.get('/recipes/complexSearch', params=search_params(query), priority=priority, cost=SEARCH_COST)
     
-    # Beverages
-    'lassi': {
-        'id': 'indian_lassi_001',
-        'title': 'Sweet Lassi',
-        'image': 'https://images.unsplash.com/photo-1595473896097-24b58ddfdc6b?w=300&q=80',
-        'nutrition': {'calories': 180, 'protein': 6, 'fat': 4, 'carbs': 32}
-    },
-    'mango lassi': {
-        'id': 'indian_mango_lassi_001',
-        'title': 'Mango Lassi',
-        'image': 'https://images.unsplash.com/photo-1595473896107-24b58ddfdc6b?w=300&q=80',
-        'nutrition': {'calories': 220, 'protein': 6, 'fat': 4, 'carbs': 42}
-    },
-    'chai': {
-        'id': 'indian_chai_001',
-        'title': 'Masala Chai',
-        'image': 'https://images.unsplash.com/photo-1571934811356-5cc061b6821f?w=300&q=80',
-        'nutrition': {'calories': 80, 'protein': 3, 'fat': 3, 'carbs': 12}
-    },
-    'filter coffee': {
-        'id': 'indian_filter_coffee_001',
-        'title': 'South Indian Filter Coffee',
-        'image': 'https://images.unsplash.com/photo-1509042239860-f550ce710b93?w=300&q=80',
-        'nutrition': {'calories': 75, 'protein': 3, 'fat': 3, 'carbs': 10}
-    },
-    'nimbu pani': {
-        'id': 'indian_nimbu_pani_001',
-        'title': 'Nimbu Pani (Lemonade)',
-        'image': 'https://images.unsplash.com/photo-1595473896117-24b58ddfdc6b?w=300&q=80',
-        'nutrition': {'calories': 60, 'protein': 0, 'fat': 0, 'carbs': 15}
-    },
-    'sugarcane juice': {
-        'id': 'indian_sugarcane_juice_001',
-        'title': 'Fresh Sugarcane Juice',
-        'image': 'https://images.unsplash.com/photo-1595473896127-24b58ddfdc6b?w=300&q=80',
-        'nutrition': {'calories': 180, 'protein': 0, 'fat': 0, 'carbs': 45}
+    if response.status_code != 200:
+        # Don't cache upstream failures, only genuine (possibly empty) answers
+        log.warning('Spoonacular search failed', extra={'query': query, 'status': response.status_code})
+        return []
+
+    spoonacular_results = search_results_from_payload(query, response.json())
+    search_cache.set(normalize_query(query), spoonacular_results)
+    return spoonacular_results
+
+# Seconds /api/search waits for Spoonacular before answering from local foods only
+SEARCH_LATENCY_BUDGET = float(os.environ.get('SEARCH_LATENCY_BUDGET', 2.0))
+
+# Most upstream fetches queued or running per worker; searches beyond that
+# answer from local foods rather than piling up behind a slow Spoonacular
+UPSTREAM_MAX_PENDING = int(os.environ.get('UPSTREAM_MAX_PENDING', 32))
+metrics.describe('upstream_fetches_rejected_total', 'counter', 'Searches answered from local foods because too many Spoonacular fetches were pending')
+
+_upstream_executor = None
+_upstream_executor_pid = None
+_upstream_slots = None
+
+def upstream_executor():
+    """Thread pool for upstream fetches, created lazily in each worker process"""
+    global _upstream_executor, _upstream_executor_pid, _upstream_slots
+    if _upstream_executor is None or _upstream_executor_pid != os.getpid():
+        _upstream_executor = ThreadPoolExecutor(
+            max_workers=int(os.environ.get('UPSTREAM_FETCH_THREADS', 8)),
+            thread_name_prefix='upstream'
+        )
+        _upstream_slots = threading.BoundedSemaphore(UPSTREAM_MAX_PENDING)
+        _upstream_executor_pid = os.getpid()
+    return _upstream_executor
+
+def submit_upstream_fetch(fn, *args):
+    """Run ``fn`` on the upstream pool, or return ``None`` if it already has UPSTREAM_MAX_PENDING fetches"""
+    executor = upstream_executor()
+    if not _upstream_slots.acquire(blocking=False):
+        metrics.inc('upstream_fetches_rejected_total')
+        return None
+    slots = _upstream_slots
+    future = executor.submit(fn, *args)
+    future.add_done_callback(lambda _: slots.release())
+    return future
+
+class SuggestIndex:
+    """Prefix lookup over food titles for search-as-you-type.
+
+    Every title is indexed under each of its word suffixes, so 'pan'
+    finds both 'Paneer Tikka' and 'Palak Paneer'. Titles are ranked once
+    by popularity; the top ``k`` for every prefix up to
+    ``TABLE_PREFIX_LENGTH`` characters is precomputed, and longer prefixes
+    bisect a sorted key list whose matching range is already small.
+    """
+
+    TABLE_PREFIX_LENGTH = 3
+
+    def __init__(self, entries, k=10):
+        """``entries``: ``(food id, title, weight)``, heavier first when titles collide"""
+        self.k = k
+        self.ids = []
+        self.titles = []
+        seen = set()
+        weights = []
+        for food_id, title, weight in entries:
+            folded = ' '.join(_words(title))
+            if not folded or folded in seen:
+                continue
+            seen.add(folded)
+            self.ids.append(food_id)
+            self.titles.append(title)
+            weights.append(weight)
+
+        # Rank 0 is the best suggestion: most served, then the shortest title
+        order = sorted(range(len(self.titles)), key=lambda i: (-weights[i], len(self.titles[i]), self.titles[i]))
+        self._rank = array('I', bytes(4 * len(order)))
+        for rank, ordinal in enumerate(order):
+            self._rank[ordinal] = rank
+
+        # Keys end in a space so 'dal ' matches the word 'dal' but not 'dalia'
+        keyed = sorted(
+            (' '.join(words[start:]) + ' ', ordinal)
+            for ordinal, words in enumerate(_words(title) for title in self.titles)
+            for start in range(len(words))
+        )
+        self._keys = [key for key, _ in keyed]
+        self._key_ordinals = array('I', (ordinal for _, ordinal in keyed))
+
+        by_prefix = defaultdict(set)
+        for key, ordinal in keyed:
+            for length in range(1, min(len(key), self.TABLE_PREFIX_LENGTH) + 1):
+                by_prefix[key[:length]].add(ordinal)
+        self._top = {
+            prefix: heapq.nsmallest(k, ordinals, key=self._rank.__getitem__)
+            for prefix, ordinals in by_prefix.items()
+        }
+
+    def __len__(self):
+        return len(self.titles)
+
+    def suggest(self, prefix, limit=10):
+        """Best ``limit`` ``(food id, title)`` pairs with a word starting with ``prefix``"""
+        words = _words(prefix)
+        if not words:
+            return []
+        prefix = ' '.join(words) + (' ' if prefix[-1:].isspace() else '')
+        if len(prefix) <= self.TABLE_PREFIX_LENGTH and limit <= self.k:
+            ordinals = self._top.get(prefix, [])[:limit]
+        else:
+            start = bisect_left(self._keys, prefix)
+            end = bisect_left(self._keys, prefix + '\uffff', start)
+            ordinals = heapq.nsmallest(limit, set(self._key_ordinals[start:end]), key=self._rank.__getitem__)
+        return [(self.ids[ordinal], self.titles[ordinal]) for ordinal in ordinals]
+
+SUGGEST_REFRESH_INTERVAL = float(os.environ.get('SUGGEST_REFRESH_INTERVAL', 60))
+SUGGEST_MAX_TITLES = int(os.environ.get('SUGGEST_MAX_TITLES', 20000))
+MAX_SUGGESTIONS = 20
+
+_suggest_index = None
+# The catalog index and seen_titles version the suggestion index was built from
+_suggest_built_for = None
+_suggest_built_from = None
+_suggest_checked_at = 0.0
+_suggest_rebuild_lock = threading.Lock()
+
+def build_suggest_index():
+    """Catalog foods plus Spoonacular titles users have been shown, weighted by how often"""
+    global _suggest_index, _suggest_built_for, _suggest_built_from, _suggest_checked_at
+    food_index = current_food_index()
+    # Read first, so titles flushed during the build trigger the next one
+    version = query_stats.seen_titles_version()
+    served = {food_id: (title, count) for food_id, title, count in query_stats.seen_titles(SUGGEST_MAX_TITLES)}
+    catalog = food_index.catalog
+    entries = []
+    for ordinal in range(len(catalog)):
+        food_id = catalog.food_id(ordinal)
+        # Local foods always count as served once so they are offered from day one
+        entries.append((food_id, catalog.title(ordinal), 1 + served.pop(food_id, (None, 0))[1]))
+    entries.extend((food_id, title, count) for food_id, (title, count) in served.items())
+    # Heaviest first, so a duplicate title keeps its most popular id
+    entries.sort(key=lambda entry: -entry[2])
+
+    _suggest_index = SuggestIndex(entries)
+    _suggest_built_for = food_index
+    _suggest_built_from = version
+    _suggest_checked_at = time.monotonic()
+    return _suggest_index
+
+def _rebuild_suggest_index_in_background():
+    try:
+        # Most checks find nothing new; only then is the index rebuilt
+        if _suggest_built_for is not current_food_index() or query_stats.seen_titles_version() != _suggest_built_from:
+            build_suggest_index()
+    except sqlite3.Error as e:
+        log.warning('Suggestion index rebuild failed', extra={'error': str(e)})
+    finally:
+        _suggest_rebuild_lock.release()
+
+def current_suggest_index():
+    """The live suggestion index, checked for new catalog foods or served titles off the request thread"""
+    global _suggest_checked_at
+    if _suggest_index is None:
+        with _suggest_rebuild_lock:
+            return _suggest_index or build_suggest_index()
+    due = (
+        time.monotonic() - _suggest_checked_at >= SUGGEST_REFRESH_INTERVAL
+        or _suggest_built_for is not current_food_index()
+    )
+    if due and _suggest_rebuild_lock.acquire(blocking=False):
+        _suggest_checked_at = time.monotonic()
+        threading.Thread(target=_rebuild_suggest_index_in_background, name='suggest-rebuild', daemon=True).start()
+    return _suggest_index
+
+def suggest_response(args):
+    """The /api/suggest body for ``?prefix=&limit=``"""
+    prefix = args.get('prefix', '')
+    try:
+        limit = min(max(int(args.get('limit', 8)), 1), MAX_SUGGESTIONS)
+    except ValueError:
+        limit = 8
+    suggestions = current_suggest_index().suggest(prefix, limit)
+    return {
+        'prefix': prefix,
+        'suggestions': [
+            {'id': food_id, 'title': title, 'source': 'local' if food_id.startswith('indian_') else 'spoonacular'}
+            for food_id, title in suggestions
+        ]
     }
-}
 
-def search_indian_foods(query):
-    """Search for Indian foods in our local database"""
-    query_lower = query.lower().strip()
-    results = []
+@app.route('/api/suggest')
+def suggest_foods():
+    return jsonify(suggest_response(request.args))
+
+def search_response(query, spoonacular_results, indian_results, partial):
+    """The /api/search body: Spoonacular results first, then Indian foods"""
+    # Combine results - prioritize Spoonacular, then add Indian foods
+    combined_results = spoonacular_results + indian_results
     
-    for food_key, food_data in INDIAN_FOODS_DB.items():
-        # Check if query matches food name (exact or partial)
-        if query_lower in food_key or food_key in query_lower:
-            results.append(food_data)
-        # Also check if query matches in title
-        elif query_lower in food_data['title'].lower():
-            results.append(food_data)
+    # If no results from either source, provide helpful message
+    if not combined_results:
+        return {
+            'searchResults': [],
+            'partial': partial,
+            'message': f'No results found for "{query}". Try searching for popular foods like "dosa", "samosa", "biryani", "pizza", "burger", etc.'
+        }
     
-    return results[:10]  # Limit to 10 results
+    # Limit total results to 10
+    final_results = combined_results[:10]
+    return {
+        'searchResults': final_results,
+        'partial': partial,
+        'message': f'Found {len(final_results)} results for "{query}"'
+    }
 
 @app.route('/api/search')
 def search_food():
@@ -454,63 +2531,51 @@ def search_food():
         return jsonify({'error': 'Query parameter is required'}), 400
     
     try:
-        print(f"Searching for query: {query}")
-        print(f"Using API key: {SPOONACULAR_API_KEY}")
+        request_log.info('Search', extra={'query': query})
         
-        # First, search Spoonacular API
-        response = requests.get(
-            f'{SPOONACULAR_BASE_URL}/recipes/complexSearch',
-            params={
-                'apiKey': SPOONACULAR_API_KEY,
-                'query': query,
-                'number': 10,  # Limit results to 10 items
-                'addNutrition': True
-            }
-        )
-        
-        print(f"API Response Status: {response.status_code}")
-        spoonacular_results = []
-        
-        if response.status_code == 200:
-            data = response.json()
-            print(f"API Response Data: {data}")
-            
-            if 'results' in data and data['results']:
-                spoonacular_results = [{
-                    'id': item['id'],
-                    'title': item['title'],
-                    'image': item['image'],
-                    'nutrition': {
-                        'calories': item.get('nutrition', {}).get('nutrients', [{'amount': 0}])[0]['amount'],
-                        'protein': next((n['amount'] for n in item.get('nutrition', {}).get('nutrients', []) if n['name'] == 'Protein'), 0),
-                        'fat': next((n['amount'] for n in item.get('nutrition', {}).get('nutrients', []) if n['name'] == 'Fat'), 0),
-                        'carbs': next((n['amount'] for n in item.get('nutrition', {}).get('nutrients', []) if n['name'] == 'Carbohydrates'), 0)
-                    }
-                } for item in data['results']]
-        
-        # Search Indian foods database
-        indian_results = search_indian_foods(query)
+        started = time.monotonic()
+        # A cached answer is read right here; only a miss goes to Spoonacular
+        # in the background...
+        spoonacular_results = cached_spoonacular_results(query)
+        upstream = None
+        if spoonacular_results is None:
+            upstream = submit_upstream_fetch(fetch_spoonacular_results, query)
         
-        # Combine results - prioritize Spoonacular, then add Indian foods
-        combined_results = spoonacular_results + indian_results
+        # ...while searching the Indian foods database on this thread
+        with metrics.timer('stage_duration_seconds', stage='local_search'):
+            indian_results = search_indian_foods(query)
         
-        # If no results from either source, provide helpful message
-        if not combined_results:
-            return jsonify({
-                'searchResults': [],
-                'message': f'No results found for "{query}". Try searching for popular foods like "dosa", "samosa", "biryani", "pizza", "burger", etc.'
-            }), 200
-        
-        # Limit total results to 10
-        final_results = combined_results[:10]
+        partial = False
+        try:
+            if spoonacular_results is None and upstream is None:
+                # Too many fetches already waiting on Spoonacular
+                log.warning('Upstream fetch queue full', extra={'query': query, 'pending': UPSTREAM_MAX_PENDING})
+                spoonacular_results = []
+                partial = True
+            elif upstream is not None:
+                budget_left = max(0.0, SEARCH_LATENCY_BUDGET - (time.monotonic() - started))
+                # Only the time this request spends waiting on the fetch that
+                # did not overlap with the local search
+                with metrics.timer('stage_duration_seconds', stage='upstream_wait'):
+                    spoonacular_results = upstream.result(timeout=budget_left)
+        except FutureTimeoutError:
+            # Answer with local foods now; the fetch keeps running and warms
+            # the search cache for the next request when it completes
+            log.warning('Spoonacular missed the search latency budget', extra={'query': query, 'budget': SEARCH_LATENCY_BUDGET})
+            spoonacular_results = []
+            partial = True
+        except requests.RequestException as e:
+            # Upstream is down or the breaker is open: answer from local foods only
+            log.warning('Spoonacular unavailable', extra={'query': query, 'error': str(e)})
+            spoonacular_results = []
         
-        return jsonify({
-            'searchResults': final_results,
-            'message': f'Found {len(final_results)} results for "{query}"'
-        })
+        body = search_response(query, spoonacular_results, indian_results, partial)
+        query_stats.record_served(body['searchResults'])
+        with metrics.timer('stage_duration_seconds', stage='serialization'):
+            return jsonify(body)
         
     except Exception as e:
-        print(f"Error in search: {str(e)}")
+        log.exception('Error in search', extra={'query': query})
         # If API fails, return only Indian foods results
         indian_results = search_indian_foods(query)
         if indian_results:
@@ -525,20 +2590,140 @@ def search_food():
             'message': 'Please try again later or search for Indian foods like "dosa", "samosa", "biryani"'
         }), 500
     except requests.RequestException as e:
-        print(f"Request Exception: {str(e)}")
+        log.error('Request exception', extra={'error': str(e)})
         return jsonify({
-            'error': 'Failed to fetch data from Spoonacular API',
-            'details': str(e)
+            'error': 'Failed to fetch data from Spoonacular API'
         }), 500
-    except Exception as e:
-        print(f"Unexpected error: {str(e)}")
+    except Exception:
+        log.exception('Unexpected error in search')
         return jsonify({
-            'error': 'An unexpected error occurred',
-            'details': str(e)
+            'error': 'An unexpected error occurred'
         }), 500
 
-@app.route('/api/nutrition')
+# Upper bound on ids resolved by one batch nutrition request
+MAX_NUTRITION_BATCH = 100
+
+# Returned instead of the upstream error, whose text is for the logs only
+NUTRITION_UNAVAILABLE = 'Nutrition service temporarily unavailable'
+
+def _parse_nutrition_ids(method, args, body):
+    """Collect batch ids from ``?ids=a,b,c`` or a JSON body ``{"ids": [...]}``"""
+    if method == 'POST':
+        body = body or {}
+        ids = body.get('ids') if isinstance(body, dict) else body
+        if not isinstance(ids, list):
+            return None
+    else:
+        ids = args.get('ids', '').split(',')
+
+    # Drop blanks and duplicates while keeping the caller's order
+    return list(dict.fromkeys(str(food_id).strip() for food_id in ids if str(food_id).strip()))
+
+def bulk_nutrition_params(recipe_ids):
+    return {
+        'ids': ','.join(recipe_ids),
+        'includeNutrition': True
+    }
+
+def cache_recipe_nutrition(payloads):
+    """``{recipe id: nutrition}`` from recipe information payloads, cached for next time"""
+    nutrition = {}
+    for data in payloads:
+        recipe_id = str(data['id'])
+        nutrition[recipe_id] = extract_nutrition(data)
+        nutrition_cache.set(recipe_id, nutrition[recipe_id])
+    return nutrition
+
+def fetch_recipe_nutrition(recipe_ids, priority=QuotaGovernor.INTERACTIVE):
+    """``{recipe id: nutrition}``, from cache or one informationBulk call for the rest"""
+    nutrition = {}
+    uncached = []
+    for recipe_id in recipe_ids:
+        cached = nutrition_cache.get(recipe_id)
+        if cached is None:
+            uncached.append(recipe_id)
+        else:
+            nutrition[recipe_id] = cached
+
+    if uncached:
+        def fetch(keys):
+            fetched = _fetch_bulk_nutrition([recipe_id for _, recipe_id in keys], priority)
+            return {(priority, recipe_id): value for recipe_id, value in fetched.items()}
+        shared = nutrition_flight.do_many([(priority, recipe_id) for recipe_id in uncached], fetch)
+        nutrition.update({recipe_id: value for (_, recipe_id), value in shared.items()})
+
+    return nutrition
+
+def _fetch_bulk_nutrition(recipe_ids, priority=QuotaGovernor.INTERACTIVE):
+    response = spoonacular.get(
+        '/recipes/informationBulk',
+        params=bulk_nutrition_params(recipe_ids),
+        priority=priority,
+        cost=bulk_nutrition_cost(recipe_ids)
+    )
+    response.raise_for_status()
+    return cache_recipe_nutrition(response.json())
+
+def _fetch_recipe_nutrition(recipe_id):
+    # Just the nutrition, not the whole recipe with ingredients and steps
+    response = spoonacular.get(f'/recipes/{recipe_id}/nutritionWidget.json')
+    response.raise_for_status()
+    nutrition = extract_nutrition(response.json())
+    nutrition_cache.set(recipe_id, nutrition)
+    return nutrition
+
+def split_nutrition_ids(food_ids):
+    """``(local nutrition, unknown local ids, recipe ids)`` for a batch of ids"""
+    nutrition = {}
+    missing = []
+    recipe_ids = []
+
+    index = current_food_index()
+    for food_id in food_ids:
+        if food_id.startswith('indian_'):
+            food_data = index.get_by_id(food_id)
+            if food_data is None:
+                missing.append(food_id)
+            else:
+                nutrition[food_id] = food_data['nutrition']
+        else:
+            recipe_ids.append(food_id)
+    return nutrition, missing, recipe_ids
+
+def nutrition_batch_response(food_ids, nutrition, missing, recipe_ids, upstream_failed=False):
+    """The batch body; recipes left unresolved by a failed upstream call go under ``errors``, not ``missing``"""
+    unresolved = [food_id for food_id in recipe_ids if food_id not in nutrition]
+    body = {
+        'nutrition': {food_id: nutrition[food_id] for food_id in food_ids if food_id in nutrition},
+        'missing': missing if upstream_failed else missing + unresolved
+    }
+    if upstream_failed and unresolved:
+        body['errors'] = {food_id: NUTRITION_UNAVAILABLE for food_id in unresolved}
+    return body
+
+def get_nutrition_batch(food_ids):
+    """Resolve many ids at once: local foods from the index, the rest in one upstream call"""
+    nutrition, missing, recipe_ids = split_nutrition_ids(food_ids)
+    upstream_failed = False
+    if recipe_ids:
+        try:
+            nutrition.update(fetch_recipe_nutrition(recipe_ids))
+        except requests.RequestException as e:
+            # Still answer with the local foods
+            log.warning('Nutrition lookup failed', extra={'error': str(e)})
+            upstream_failed = True
+    return nutrition_batch_response(food_ids, nutrition, missing, recipe_ids, upstream_failed)
+
+@app.route('/api/nutrition', methods=['GET', 'POST'])
 def get_nutrition():
+    if request.method == 'POST' or 'ids' in request.args:
+        food_ids = _parse_nutrition_ids(request.method, request.args, request.get_json(silent=True))
+        if not food_ids:
+            return jsonify({'error': 'A list of food IDs is required'}), 400
+        if len(food_ids) > MAX_NUTRITION_BATCH:
+            return jsonify({'error': f'At most {MAX_NUTRITION_BATCH} food IDs per request'}), 400
+        return jsonify(get_nutrition_batch(food_ids))
+
     food_id = request.args.get('id')
     if not food_id:
         return jsonify({'error': 'Food ID is required'}), 400
@@ -546,103 +2731,848 @@ def get_nutrition():
     try:
         # Check if it's an Indian food from our local database
         if str(food_id).startswith('indian_'):
-            # Find the food in our database
-            for food_key, food_data in INDIAN_FOODS_DB.items():
-                if food_data['id'] == food_id:
-                    return jsonify({
-                        'nutrition': food_data['nutrition']
-                    })
+            food_data = current_food_index().get_by_id(food_id)
+            if food_data is not None:
+                return jsonify({
+                    'nutrition': food_data['nutrition']
+                })
             
             return jsonify({'error': 'Indian food not found in database'}), 404
         
-        # For Spoonacular API foods
-        response = requests.get(
-            f'{SPOONACULAR_BASE_URL}/recipes/{food_id}/information',
-            params={
-                'apiKey': SPOONACULAR_API_KEY,
-                'includeNutrition': True
-            }
-        )
-        response.raise_for_status()
-        data = response.json()
-        # Transform the response to match frontend expectations
-        nutrition_info = {
-            'nutrition': {
-                'calories': data['nutrition']['nutrients'][0]['amount'],
-                'protein': next((n['amount'] for n in data['nutrition']['nutrients'] if n['name'] == 'Protein'), 0),
-                'fat': next((n['amount'] for n in data['nutrition']['nutrients'] if n['name'] == 'Fat'), 0),
-                'carbs': next((n['amount'] for n in data['nutrition']['nutrients'] if n['name'] == 'Carbohydrates'), 0)
-            }
-        }
-        return jsonify(nutrition_info)
+        # For Spoonacular API foods, unless already cached
+        nutrition = nutrition_cache.get(food_id)
+        if nutrition is None:
+            nutrition = nutrition_flight.do((QuotaGovernor.INTERACTIVE, food_id), _fetch_recipe_nutrition, food_id)
+        return jsonify({'nutrition': nutrition})
     except requests.RequestException as e:
-        return jsonify({'error': str(e)}), 500
+        log.warning('Nutrition lookup failed', extra={'food_id': food_id, 'error': str(e)})
+        return jsonify({'error': NUTRITION_UNAVAILABLE}), 500
+
+# Cache warm-up: replay popular queries so a fresh deploy doesn't serve them cold
+WARMUP_INTERVAL = float(os.environ.get('WARMUP_INTERVAL', 3600))
+WARMUP_QUOTA = int(os.environ.get('WARMUP_QUOTA', 20))
+WARMUP_TOP_QUERIES = int(os.environ.get('WARMUP_TOP_QUERIES', 50))
+WARMUP_WINDOW = float(os.environ.get('WARMUP_WINDOW', 7 * 86400))
+WARMUP_RESULTS_PER_QUERY = int(os.environ.get('WARMUP_RESULTS_PER_QUERY', 3))
+
+def warm_caches(quota=WARMUP_QUOTA):
+    """Refresh the most popular recent queries that are not cached, then
+    pre-resolve nutrition for their top results, using at most ``quota``
+    upstream calls. Returns a report of what was warmed.
+    """
+    query_stats.flush()
+    calls = 0
+    warmed = []
+    recipe_ids = []
+    shed = False
+    try:
+        for stats in query_stats.top(WARMUP_TOP_QUERIES, time.time() - WARMUP_WINDOW):
+            # Keep one call back for the nutrition batch
+            if calls >= quota - 1:
+                break
+            query = stats['query']
+            results = search_cache.peek(query)
+            if results is None:
+                results = search_flight.do((QuotaGovernor.WARMUP, query), refresh_search_cache, query, QuotaGovernor.WARMUP)
+                calls += 1
+                warmed.append(query)
+            recipe_ids.extend(
+                str(result['id']) for result in results[:WARMUP_RESULTS_PER_QUERY]
+                if nutrition_cache.peek(str(result['id'])) is None
+            )
+
+        recipe_ids = list(dict.fromkeys(recipe_ids))
+        for start in range(0, len(recipe_ids), MAX_NUTRITION_BATCH):
+            if calls >= quota:
+                break
+            # Nobody has asked for these yet, so they are the first to go when quota is short
+            fetch_recipe_nutrition(recipe_ids[start:start + MAX_NUTRITION_BATCH], priority=QuotaGovernor.SPECULATIVE)
+            calls += 1
+    except QuotaExhausted:
+        # Leave the rest of the day's budget to users
+        shed = True
+
+    return {'queries': warmed, 'recipes': len(recipe_ids), 'upstream_calls': calls, 'shed': shed}
+
+# The warm-up lease is renewed this often (seconds), and left to expire
+# after three missed renewals
+WARMUP_LEASE_RENEW = 20
+# Long enough for one warm-up run, during which the lease isn't renewed
+WARMUP_RUN_TIMEOUT = 600
+
+def build_food_index():
+    """Build the catalog index ahead of the first search; a broken catalog is logged, not raised"""
+    try:
+        current_food_index()
+    except (OSError, ValueError) as e:
+        log.warning('Building the food index failed', extra={'error': str(e)})
+
+def _run_cache_warmer():
+    # Only the worker holding the lease warms. It warms as soon as it gets
+    # the lease, so a fresh deploy warms right away, and then every interval.
+    # The others retry every few seconds to take over if it goes away.
+    holder = f'{os.getpid()}:{os.urandom(4).hex()}'
+    next_warmup = 0.0
+    # Every worker builds the catalog index here, not in its first search
+    build_food_index()
+    while True:
+        try:
+            if query_stats.acquire_lease('cache-warmup', 3 * WARMUP_LEASE_RENEW, holder):
+                if time.monotonic() >= next_warmup:
+                    query_stats.acquire_lease('cache-warmup', WARMUP_RUN_TIMEOUT, holder)
+                    next_warmup = time.monotonic() + WARMUP_INTERVAL * random.uniform(0.9, 1.1)
+                    report = warm_caches()
+                    log.info('Cache warm-up', extra=report)
+                    query_stats.acquire_lease('cache-warmup', 3 * WARMUP_LEASE_RENEW, holder)
+            else:
+                # Whoever holds it now has its own schedule; start over if we get it back
+                next_warmup = 0.0
+        except (requests.RequestException, sqlite3.Error) as e:
+            log.warning('Cache warm-up failed', extra={'error': str(e)})
+        time.sleep(WARMUP_LEASE_RENEW * random.uniform(0.9, 1.1))
+
+_cache_warmer_pid = None
+
+def start_cache_warmer():
+    """Start the warm-up thread once per worker process (WARMUP_INTERVAL=0 disables it)"""
+    global _cache_warmer_pid
+    if WARMUP_INTERVAL <= 0 or _cache_warmer_pid == os.getpid():
+        return
+    _cache_warmer_pid = os.getpid()
+    threading.Thread(target=_run_cache_warmer, name='cache-warmer', daemon=True).start()
+
+@app.before_request
+def _ensure_cache_warmer():
+    # Threads don't survive fork, so (re)start lazily in each worker
+    start_cache_warmer()
+
+DEFAULT_USER_ID = 'default'
+
+def current_user_id():
+    """The caller's user id from the X-User-Id header or ?user=, else the shared default"""
+    return request.headers.get('X-User-Id') or request.args.get('user') or DEFAULT_USER_ID
+
+def encode_log_cursor(position):
+    """Opaque cursor for a ``(logged_at, id)`` log position"""
+    return base64.urlsafe_b64encode(json.dumps(position).encode()).decode()
+
+def decode_log_cursor(cursor):
+    logged_at, entry_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return str(logged_at), int(entry_id)
+
+def _parse_log_window():
+    """``(start, end)`` ISO bounds from ?date= or ?start=&end=; defaults to today"""
+    if 'start' in request.args or 'end' in request.args:
+        start = datetime.datetime.fromisoformat(request.args['start']) if 'start' in request.args else datetime.datetime.min
+        end = datetime.datetime.fromisoformat(request.args['end']) if 'end' in request.args else datetime.datetime.max
+        # A bare end date includes that whole day
+        if 'end' in request.args and len(request.args['end']) == 10:
+            end += datetime.timedelta(days=1)
+        return start.isoformat(), end.isoformat()
+
+    day = datetime.date.fromisoformat(request.args['date']) if 'date' in request.args else datetime.date.today()
+    return day.isoformat(), (day + datetime.timedelta(days=1)).isoformat()
 
 @app.route('/api/log-food', methods=['POST'])
 def log_food():
     food_data = request.json
     if not food_data:
         return jsonify({'error': 'Food data is required'}), 400
+    name = _non_finite_nutrient(food_data.get('nutrition')) if isinstance(food_data, dict) else None
+    if name is not None:
+        return jsonify({'error': f'nutrition.{name} must be a finite number'}), 400
     
     # Add timestamp to the food log
     food_entry = {
         **food_data,
         'timestamp': datetime.datetime.now().isoformat()
     }
-    daily_food_log.append(food_entry)
+    food_log_store.append(current_user_id(), food_entry)
     
     return jsonify({
         'message': 'Food logged successfully',
         'food': food_entry
     })
 
+# Most entries accepted by a single /api/log-food/bulk request
+MAX_BULK_LOG_ENTRIES = 10000
+
+def _read_bulk_items():
+    """Items of a JSON array body, or of an NDJSON body one line at a time.
+
+    Lines that are not valid JSON are yielded as ``ValueError`` instances so
+    they can be reported per item instead of failing the whole import.
+    """
+    if request.mimetype == 'application/x-ndjson':
+        for line in request.stream:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError as e:
+                yield ValueError(f'Invalid JSON: {e}')
+        return
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        raise ValueError('Body must be a JSON array or NDJSON')
+    yield from items
+
+def _non_finite_nutrient(nutrition):
+    """Name of the first NaN or infinite amount in ``nutrition`` (which JSON parsing lets through), or ``None``"""
+    if isinstance(nutrition, dict):
+        for name, amount in nutrition.items():
+            if isinstance(amount, float) and not math.isfinite(amount):
+                return name
+    return None
+
+def _validate_log_entry(item, logged_at):
+    """Return ``(entry, None)`` ready to store, or ``(None, error message)``"""
+    if isinstance(item, ValueError):
+        return None, str(item)
+    if not isinstance(item, dict) or not item:
+        return None, 'Entry must be a non-empty JSON object'
+    if 'nutrition' in item and not isinstance(item['nutrition'], dict):
+        return None, 'nutrition must be an object'
+    name = _non_finite_nutrient(item.get('nutrition'))
+    if name is not None:
+        return None, f'nutrition.{name} must be a finite number'
+
+    # Imports keep their original time; everything else is stamped now
+    timestamp = item.get('timestamp')
+    if timestamp is None:
+        return {**item, 'timestamp': logged_at}, None
+    try:
+        parsed = datetime.datetime.fromisoformat(str(timestamp).replace('Z', '+00:00'))
+    except ValueError:
+        return None, 'timestamp must be an ISO 8601 date-time'
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone().replace(tzinfo=None)
+    return {**item, 'timestamp': parsed.isoformat()}, None
+
+@app.route('/api/log-food/bulk', methods=['POST'])
+def log_food_bulk():
+    """Log many entries (JSON array or NDJSON) in one transaction"""
+    logged_at = datetime.datetime.now().isoformat()
+    entries = []
+    errors = []
+    try:
+        for index, item in enumerate(_read_bulk_items()):
+            if index >= MAX_BULK_LOG_ENTRIES:
+                return jsonify({'error': f'At most {MAX_BULK_LOG_ENTRIES} entries per request'}), 413
+            entry, error = _validate_log_entry(item, logged_at)
+            if error:
+                errors.append({'index': index, 'error': error})
+            else:
+                entries.append(entry)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not entries:
+        return jsonify({'error': 'No valid entries to log', 'logged': 0, 'errors': errors}), 400
+
+    food_log_store.add_many(current_user_id(), entries)
+    return jsonify({
+        'message': f'Logged {len(entries)} entries',
+        'logged': len(entries),
+        'errors': errors
+    })
+
+# Page sizes for cursor-paginated /api/daily-log requests
+DAILY_LOG_PAGE_SIZE = 100
+MAX_DAILY_LOG_PAGE_SIZE = 1000
+
 @app.route('/api/daily-log', methods=['GET'])
 def get_daily_log():
-    return jsonify(daily_food_log)
+    try:
+        start, end = _parse_log_window()
+    except (ValueError, OverflowError):
+        return jsonify({'error': 'Dates must be in ISO format, e.g. 2024-01-31'}), 400
+
+    try:
+        after = decode_log_cursor(request.args['after']) if 'after' in request.args else None
+    except (ValueError, TypeError):
+        return jsonify({'error': 'Invalid cursor'}), 400
+
+    user_id = current_user_id()
+
+    # NDJSON: one entry per line, streamed straight from the store
+    if request.args.get('format') == 'ndjson' or request.accept_mimetypes.best == 'application/x-ndjson':
+        lines = (json.dumps(entry) + '\n' for entry in food_log_store.iter_entries(user_id, start, end, after))
+        return Response(stream_with_context(lines), mimetype='application/x-ndjson')
+
+    if 'limit' in request.args or after is not None:
+        limit = request.args.get('limit', DAILY_LOG_PAGE_SIZE, type=int)
+        if not limit or not 0 < limit <= MAX_DAILY_LOG_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_DAILY_LOG_PAGE_SIZE}'}), 400
+        entries, last = food_log_store.page(user_id, start, end, after, limit)
+        return jsonify({
+            'entries': entries,
+            'next_cursor': encode_log_cursor(last) if len(entries) == limit else None
+        })
+
+    return jsonify(food_log_store.entries(user_id, start, end))
+
+def _is_admin():
+    """Whether the request carries ADMIN_TOKEN in X-Admin-Token (never true if unset)"""
+    admin_token = os.environ.get('ADMIN_TOKEN')
+    return bool(admin_token) and request.headers.get('X-Admin-Token') == admin_token
+
+@app.route('/api/admin/reload-catalog', methods=['POST'])
+def reload_catalog():
+    """Reload the local foods catalog now; requires ADMIN_TOKEN in X-Admin-Token"""
+    if not _is_admin():
+        return jsonify({'error': 'Not authorized'}), 403
+
+    try:
+        index = reload_indian_foods()
+    except (OSError, ValueError, KeyError, TypeError):
+        # The details (paths, parser messages) go to the log, not the client
+        log.exception('Catalog reload failed, keeping the current catalog')
+        return jsonify({'error': 'Catalog reload failed, keeping the current catalog'}), 500
+    if index is None:
+        return jsonify({'error': 'A catalog reload is already in progress'}), 409
+
+    return jsonify({
+        'message': 'Catalog reloaded',
+        'foods': len(index),
+        'reindexed': index.reindexed
+    })
+
+@app.route('/api/admin/warmup', methods=['GET', 'POST'])
+def cache_warmup():
+    """GET: popular queries with cold/warm counts; POST: run a warm-up now"""
+    if not _is_admin():
+        return jsonify({'error': 'Not authorized'}), 403
+
+    if request.method == 'POST':
+        try:
+            return jsonify(warm_caches(quota=request.args.get('quota', WARMUP_QUOTA, type=int)))
+        except requests.RequestException as e:
+            log.warning('Cache warm-up failed', extra={'error': str(e)})
+            return jsonify({'error': 'Cache warm-up failed, Spoonacular is unavailable'}), 502
+
+    query_stats.flush()
+    return jsonify({'queries': query_stats.top(WARMUP_TOP_QUERIES, time.time() - WARMUP_WINDOW)})
+
+# Longest range /api/summary will return in one response
+MAX_SUMMARY_DAYS = 366
+
+@app.route('/api/summary', methods=['GET'])
+def get_summary():
+    """Per-day or per-week nutrition totals, zero-filled, for charting history"""
+    period = request.args.get('period', 'day')
+    if period not in FoodLogStore.TOTALS_TABLES:
+        return jsonify({'error': "period must be 'day' or 'week'"}), 400
+
+    try:
+        end = datetime.date.fromisoformat(request.args['end']) if 'end' in request.args else datetime.date.today()
+        default_start = end - datetime.timedelta(days=6 if period == 'day' else 27)
+        start = datetime.date.fromisoformat(request.args['start']) if 'start' in request.args else default_start
+    except ValueError:
+        return jsonify({'error': 'Dates must be in ISO format, e.g. 2024-01-31'}), 400
+    if start > end or (end - start).days > MAX_SUMMARY_DAYS:
+        return jsonify({'error': f'start must not be after end and the range is limited to {MAX_SUMMARY_DAYS} days'}), 400
+
+    step = datetime.timedelta(days=1 if period == 'day' else 7)
+    if period == 'week':
+        start, end = _week_start(start), _week_start(end)
+
+    stored = food_log_store.totals(period, current_user_id(), start.isoformat(), end.isoformat())
+    empty = (0,) + (0.0,) * len(SUMMARY_NUTRIENTS)
+    totals = []
+    period_start = start
+    while period_start <= end:
+        entries, *amounts = stored.get(period_start.isoformat(), empty)
+        totals.append({
+            'start': period_start.isoformat(),
+            'entries': entries,
+            **dict(zip(SUMMARY_NUTRIENTS, amounts))
+        })
+        period_start += step
+
+    return jsonify({'period': period, 'totals': totals})
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Request latency, upstream and cache metrics for every worker, for Prometheus to scrape"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 @app.route('/api/test')
 def test_api():
     return jsonify({
         'message': 'Backend is working!',
-        'static_folder': app.static_folder,
-        'static_folder_exists': os.path.exists(app.static_folder),
-        'build_files': os.listdir(app.static_folder) if os.path.exists(app.static_folder) else []
+        'static_folder': static_folder,
+        'static_folder_exists': os.path.exists(static_folder),
+        'build_files': os.listdir(static_folder) if os.path.exists(static_folder) else [],
+        'caches': {cache.name: cache.stats() for cache in (search_cache, nutrition_cache)}
     })
 
+class StaticAssets:
+    """In-memory manifest of the React build, scanned once on first use.
+
+    Requests are answered from the manifest instead of touching the
+    filesystem to look files up. Each file records its ``.br``/``.gz``
+    siblings written by ``backend/precompress.py``; the best one the
+    client accepts is sent, with an ETag per variant so repeat visits
+    get a 304.
+    """
+
+    ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+    # CRA puts a content hash in every filename under static/
+    IMMUTABLE_PREFIX = 'static/'
+    IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+    REVALIDATE_CACHE = 'no-cache'
+
+    def __init__(self, root):
+        self.root = root
+        self._files = None
+
+    @property
+    def files(self):
+        if self._files is None:
+            self._files = self.scan()
+        return self._files
+
+    def scan(self):
+        """``{name: asset}`` for every file under the root, hashing each one"""
+        files = {}
+        if not os.path.isdir(self.root):
+            return files
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith(('.gz', '.br')):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, self.root).replace(os.sep, '/')
+                files[name] = self._describe(name, path)
+        return files
+
+    def _describe(self, name, path):
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        tag = digest.hexdigest()[:20]
+        variants = {None: (path, tag)}
+        for encoding, suffix in self.ENCODINGS:
+            if os.path.isfile(path + suffix):
+                variants[encoding] = (path + suffix, f'{tag}-{encoding}')
+        return {
+            'mimetype': mimetypes.guess_type(name)[0] or 'application/octet-stream',
+            'cache_control': self.IMMUTABLE_CACHE if name.startswith(self.IMMUTABLE_PREFIX) else self.REVALIDATE_CACHE,
+            'variants': variants
+        }
+
+    def __contains__(self, name):
+        return name in self.files
+
+    def response(self, name):
+        """The best variant of ``name`` for this request, or a 304 if the client has it"""
+        asset = self.files[name]
+        encoding = next(
+            (encoding for encoding, _ in self.ENCODINGS
+             if encoding in asset['variants'] and request.accept_encodings[encoding]),
+            None
+        )
+        path, etag = asset['variants'][encoding]
+
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+        else:
+            response = send_file(path, mimetype=asset['mimetype'], conditional=False, etag=False)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset['cache_control']
+        if len(asset['variants']) > 1:
+            response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+static_assets = StaticAssets(static_folder)
+
 # Explicit static file serving routes
 @app.route('/static/<path:filename>')
 def serve_static_files(filename):
-    try:
-        static_path = os.path.join(app.static_folder, 'static')
-        print(f"Serving static file: {filename} from {static_path}")
-        return send_from_directory(static_path, filename)
-    except Exception as e:
-        print(f"Error serving static file: {str(e)}")
-        return jsonify({'error': f'Static file error: {str(e)}'}), 404
+    name = f'static/{filename}'
+    if name not in static_assets:
+        request_log.info('Static file not found', extra={'file': filename})
+        return jsonify({'error': f'Static file not found: {filename}'}), 404
+    return static_assets.response(name)
 
 # Serve React App for production deployment
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_react_app(path):
+    if path in static_assets:
+        return static_assets.response(path)
+    if 'index.html' not in static_assets:
+        log.warning('Frontend build not found', extra={'requested': path})
+        return jsonify({'error': 'Frontend build not found'}), 404
+    # Client-side routes all load the app shell
+    return static_assets.response('index.html')
+
+# ASGI entry point: `uvicorn backend.app:asgi_app`. The upstream-bound
+# routes run on the event loop, so one process can wait on hundreds of slow
+# Spoonacular calls; everything else is the Flask app on a thread pool.
+ASYNC_UPSTREAM_POOL_SIZE = int(os.environ.get('UPSTREAM_ASYNC_POOL_SIZE', 100))
+# Threads running the Flask routes (food log, static files, admin)
+WSGI_THREADS = int(os.environ.get('ASGI_WSGI_THREADS', 10))
+
+class AsyncUpstreamClient:
+    """``UpstreamClient`` for the event loop.
+
+    Shares the sync client's settings, circuit breaker and metrics, but
+    sends requests through a pooled ``httpx.AsyncClient``. Transport
+    errors are re-raised as their ``requests`` equivalents so callers
+    handle both clients the same way.
+    """
+
+    def __init__(self, sync_client, pool_size=100):
+        self.sync = sync_client
+        self.pool_size = pool_size
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            if not load_async_dependencies():
+                raise RuntimeError('The async client needs httpx from requirements.txt')
+            connect_timeout, read_timeout = self.sync.timeout
+            self._client = httpx.AsyncClient(
+                headers={'x-api-key': self.sync.api_key},
+                timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get(self, path, params=None, priority=QuotaGovernor.INTERACTIVE, cost=1.0):
+        """GET ``path`` (the API key goes in a header); returns the final response"""
+        sync = self.sync
+        endpoint = sync.endpoint_label(path)
+        if not sync.breaker.allow():
+            metrics.inc('upstream_errors_total', endpoint=endpoint, kind='circuit_open')
+            raise UpstreamUnavailable('Spoonacular is unavailable (circuit open)')
+        if sync.governor is not None:
+            await asyncio.to_thread(sync.governor.acquire, cost, priority)
+
+        with metrics.timer('upstream_request_duration_seconds', endpoint=endpoint):
+            response = await self._get_with_retries(path, endpoint, params or {})
+        if sync.governor is not None:
+            await asyncio.to_thread(sync.governor.record_response, response.headers, cost)
+        return response
+
+    async def _get_with_retries(self, path, endpoint, params):
+        sync = self.sync
+        for attempt in range(sync.retries + 1):
+            try:
+                response = await self.client.get(f'{sync.base_url}{path}', params=params)
+            except httpx.TransportError as e:
+                timed_out = isinstance(e, httpx.TimeoutException)
+                metrics.inc('upstream_errors_total', endpoint=endpoint, kind='timeout' if timed_out else 'connection')
+                if attempt == sync.retries:
+                    sync.breaker.record_failure()
+                    raise (requests.Timeout if timed_out else requests.ConnectionError)(str(e)) from e
+            else:
+                metrics.inc('upstream_requests_total', endpoint=endpoint, status=str(response.status_code))
+                if response.status_code not in sync.RETRY_STATUSES:
+                    sync.breaker.record_success()
+                    return response
+                metrics.inc('upstream_errors_total', endpoint=endpoint, kind=f'http_{response.status_code}')
+                if attempt == sync.retries:
+                    sync.breaker.record_failure()
+                    return response
+            await asyncio.sleep(random.uniform(0, sync.backoff * (2 ** attempt)))
+
+    @staticmethod
+    def raise_for_status(response):
+        if response.is_error:
+            raise requests.HTTPError(f'{response.status_code} Error for url: {response.url}')
+
+async_spoonacular = AsyncUpstreamClient(spoonacular, pool_size=ASYNC_UPSTREAM_POOL_SIZE)
+
+# Only user requests go through these, so unlike the threaded flights they
+# are keyed by query and recipe id alone
+async_search_flight = AsyncSingleFlight('search')
+async_nutrition_flight = AsyncSingleFlight('nutrition')
+
+# Upstream fetches that outlive their request (they still fill the cache)
+_background_fetches = set()
+
+async def fetch_spoonacular_results_async(query):
+    """Async ``fetch_spoonacular_results``; cache and stats I/O runs on worker threads"""
+    # query_stats.record may flush to SQLite, so it goes along with the lookup
+    cached = await asyncio.to_thread(cached_spoonacular_results, query)
+    if cached is not None:
+        return cached
+
+    with metrics.timer('stage_duration_seconds', stage='upstream_fetch'):
+        return await async_search_flight.do(normalize_query(query), _refresh_search_cache_async, query)
+
+async def _refresh_search_cache_async(query):
+    response = await async_spoonacular.get('/recipes/complexSearch', params=search_params(query), cost=SEARCH_COST)
+    if response.status_code != 200:
+        log.warning('Spoonacular search failed', extra={'query': query, 'status': response.status_code})
+        return []
+    spoonacular_results = search_results_from_payload(query, response.json())
+    await asyncio.to_thread(search_cache.set, normalize_query(query), spoonacular_results)
+    return spoonacular_results
+
+async def fetch_recipe_nutrition_async(recipe_ids):
+    """Async ``fetch_recipe_nutrition``"""
+    cached = await asyncio.to_thread(lambda: {recipe_id: nutrition_cache.get(recipe_id) for recipe_id in recipe_ids})
+    nutrition = {recipe_id: value for recipe_id, value in cached.items() if value is not None}
+    uncached = [recipe_id for recipe_id in recipe_ids if cached[recipe_id] is None]
+    if uncached:
+        nutrition.update(await async_nutrition_flight.do_many(uncached, _fetch_bulk_nutrition_async))
+    return nutrition
+
+async def _fetch_bulk_nutrition_async(recipe_ids):
+    response = await async_spoonacular.get(
+        '/recipes/informationBulk',
+        params=bulk_nutrition_params(recipe_ids),
+        cost=bulk_nutrition_cost(recipe_ids)
+    )
+    async_spoonacular.raise_for_status(response)
+    return await asyncio.to_thread(cache_recipe_nutrition, response.json())
+
+async def _fetch_recipe_nutrition_async(recipe_id):
+    response = await async_spoonacular.get(f'/recipes/{recipe_id}/nutritionWidget.json')
+    async_spoonacular.raise_for_status(response)
+    nutrition = extract_nutrition(response.json())
+    await asyncio.to_thread(nutrition_cache.set, recipe_id, nutrition)
+    return nutrition
+
+async def food_index_async():
+    """current_food_index(), building the catalog index on a worker thread the first time"""
+    if indian_food_index is None:
+        return await asyncio.to_thread(current_food_index)
+    return current_food_index()
+
+async def async_search_food(request):
+    query = request.args.get('query', '')
+    if not query:
+        return {'error': 'Query parameter is required'}, 400
+    request_log.info('Search', extra={'query': query})
+
+    started = time.monotonic()
+    upstream = asyncio.ensure_future(fetch_spoonacular_results_async(query))
+    await food_index_async()
+    with metrics.timer('stage_duration_seconds', stage='local_search'):
+        indian_results = search_indian_foods(query)
+
+    partial = False
     try:
-        print(f"Requested path: {path}")
-        print(f"Static folder: {app.static_folder}")
-        
-        if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-            print(f"Serving file: {path}")
-            return send_from_directory(app.static_folder, path)
+        budget_left = max(0.0, SEARCH_LATENCY_BUDGET - (time.monotonic() - started))
+        with metrics.timer('stage_duration_seconds', stage='upstream_wait'):
+            spoonacular_results = await asyncio.wait_for(asyncio.shield(upstream), budget_left)
+    except asyncio.TimeoutError:
+        # Same as the sync route: answer now, let the fetch finish and warm the cache
+        log.warning('Spoonacular missed the search latency budget', extra={'query': query, 'budget': SEARCH_LATENCY_BUDGET})
+        _background_fetches.add(upstream)
+        upstream.add_done_callback(_forget_background_fetch)
+        spoonacular_results = []
+        partial = True
+    except requests.RequestException as e:
+        log.warning('Spoonacular unavailable', extra={'query': query, 'error': str(e)})
+        spoonacular_results = []
+
+    body = search_response(query, spoonacular_results, indian_results, partial)
+    await asyncio.to_thread(query_stats.record_served, body['searchResults'])
+    return body, 200
+
+def _forget_background_fetch(task):
+    _background_fetches.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        log.warning('Background Spoonacular fetch failed', extra={'error': str(task.exception())})
+
+async def async_get_nutrition(request):
+    if request.method == 'POST' or 'ids' in request.args:
+        food_ids = _parse_nutrition_ids(request.method, request.args, request.get_json())
+        if not food_ids:
+            return {'error': 'A list of food IDs is required'}, 400
+        if len(food_ids) > MAX_NUTRITION_BATCH:
+            return {'error': f'At most {MAX_NUTRITION_BATCH} food IDs per request'}, 400
+        await food_index_async()
+        nutrition, missing, recipe_ids = split_nutrition_ids(food_ids)
+        upstream_failed = False
+        if recipe_ids:
+            try:
+                nutrition.update(await fetch_recipe_nutrition_async(recipe_ids))
+            except requests.RequestException as e:
+                log.warning('Nutrition lookup failed', extra={'error': str(e)})
+                upstream_failed = True
+        return nutrition_batch_response(food_ids, nutrition, missing, recipe_ids, upstream_failed), 200
+
+    food_id = request.args.get('id')
+    if not food_id:
+        return {'error': 'Food ID is required'}, 400
+    if food_id.startswith('indian_'):
+        food_data = (await food_index_async()).get_by_id(food_id)
+        if food_data is not None:
+            return {'nutrition': food_data['nutrition']}, 200
+        return {'error': 'Indian food not found in database'}, 404
+
+    try:
+        nutrition = await asyncio.to_thread(nutrition_cache.get, food_id)
+        if nutrition is None:
+            nutrition = await async_nutrition_flight.do(food_id, _fetch_recipe_nutrition_async, food_id)
+        return {'nutrition': nutrition}, 200
+    except requests.RequestException as e:
+        log.warning('Nutrition lookup failed', extra={'food_id': food_id, 'error': str(e)})
+        return {'error': NUTRITION_UNAVAILABLE}, 500
+
+class AsyncRequest:
+    """The bits of an ASGI HTTP request the async routes use"""
+
+    def __init__(self, scope, body):
+        self.method = scope['method']
+        self.path = scope['path']
+        self.args = {key: values[0] for key, values in parse_qs(scope['query_string'].decode('latin-1'), keep_blank_values=True).items()}
+        self.headers = {key.decode('latin-1').lower(): value.decode('latin-1') for key, value in scope['headers']}
+        self.body = body
+
+    def get_json(self):
+        try:
+            return json.loads(self.body) if self.body else None
+        except ValueError:
+            return None
+
+class AsyncApp:
+    """ASGI application serving ASYNC_ROUTES natively and the rest through Flask.
+
+    The Flask ``app`` is wrapped with a2wsgi's WSGIMiddleware, so the food log
+    routes, static files and admin endpoints keep working unchanged on
+    worker threads without blocking the event loop.
+    """
+
+    def __init__(self, flask_app, routes):
+        self.flask_app = WSGIMiddleware(flask_app, workers=WSGI_THREADS)
+        self.routes = routes
+        self.index_build = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+        route = self.routes.get(scope['path']) if scope['type'] == 'http' else None
+        # CORS preflights and anything not ported go to Flask
+        if route is None or scope['method'] == 'OPTIONS':
+            return await self.flask_app(scope, receive, send)
+
+        started = time.perf_counter()
+        methods, handler = route
+        request = AsyncRequest(scope, await self._read_body(receive))
+        if request.method not in methods:
+            body, status = {'error': 'Method not allowed'}, 405
         else:
-            print("Serving index.html")
-            index_path = os.path.join(app.static_folder, 'index.html')
-            print(f"Index.html exists: {os.path.exists(index_path)}")
-            return send_from_directory(app.static_folder, 'index.html')
-    except Exception as e:
-        print(f"Error serving file: {str(e)}")
-        return jsonify({'error': f'File serving error: {str(e)}'}), 500
+            try:
+                body, status = await handler(request)
+            except Exception:
+                log.exception('Unexpected error', extra={'path': request.path})
+                body, status = {'error': 'An unexpected error occurred'}, 500
+
+        with metrics.timer('stage_duration_seconds', stage='serialization'):
+            payload = json.dumps(body).encode()
+        headers = [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode())]
+        headers.extend(self._cors_headers(request))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload})
+
+        metrics.observe('http_request_duration_seconds', time.perf_counter() - started, route=request.path)
+        metrics.inc('http_requests_total', route=request.path, method=request.method, status=str(status))
+        if metrics.snapshot_due():
+            await asyncio.to_thread(metrics.write_snapshot)
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(chunks)
+
+    @staticmethod
+    def _cors_headers(request):
+        origin = request.headers.get('origin')
+        if CORS_ORIGINS == '*':
+            return [(b'access-control-allow-origin', b'*')]
+        if origin in CORS_ORIGINS:
+            return [(b'access-control-allow-origin', origin.encode('latin-1')), (b'vary', b'Origin')]
+        return []
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                start_cache_warmer()
+                # Build the catalog index while the first requests are on their way
+                self.index_build = asyncio.ensure_future(asyncio.to_thread(build_food_index))
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await async_spoonacular.aclose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+async def async_suggest_foods(request):
+    if _suggest_index is None:
+        # The first build reads the catalog and query stats
+        await asyncio.to_thread(current_suggest_index)
+    return suggest_response(request.args), 200
+
+ASYNC_ROUTES = {
+    '/api/search': (('GET',), async_search_food),
+    '/api/suggest': (('GET',), async_suggest_foods),
+    '/api/nutrition': (('GET', 'POST'), async_get_nutrition)
+}
+
+def create_asgi_app():
+    """The ASGI app, or None if httpx and a2wsgi (requirements.txt) are missing"""
+    if not load_async_dependencies():
+        return None
+    return AsyncApp(app, ASYNC_ROUTES)
+
+def __getattr__(name):
+    # `uvicorn backend.app:asgi_app` builds the ASGI app on first lookup
+    global asgi_app
+    if name == 'asgi_app':
+        asgi_app = create_asgi_app()
+        return asgi_app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+def create_app(preload=False):
+    """The Flask app, for ``gunicorn 'backend.app:create_app()'``.
+
+    Importing this module only registers routes; the food catalog, its
+    search index and the static asset manifest are built on first use.
+    With ``preload=True`` they are built now instead, so under
+    ``gunicorn --preload`` the master does it once and every worker forks
+    with them already in memory. Everything built so far is then moved out
+    of the garbage collector's reach (``gc.freeze``), so collections in the
+    workers don't write to those objects' headers and copy the pages they
+    share with the master.
+    """
+    if preload:
+        started = time.perf_counter()
+        foods, assets = len(current_food_index()), len(static_assets.files)
+        gc.collect()
+        gc.freeze()
+        log.info('Preloaded app state', extra={
+            'foods': foods,
+            'assets': assets,
+            'frozen_objects': gc.get_freeze_count(),
+            'ms': round((time.perf_counter() - started) * 1e3, 1)
+        })
+    return app
 
 if __name__ == '__main__':
     if not SPOONACULAR_API_KEY:
-        print("Warning: SPOONACULAR_API_KEY environment variable is not set!")
+        log.warning('SPOONACULAR_API_KEY environment variable is not set')
     
     # Use environment variables for production
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,45 @@
+"""Write .gz (and .br, when the brotli package is installed) copies of the React build.
+
+The Flask app serves these variants directly instead of compressing on every
+request. Run it after ``npm run build``:
+
+    python backend/precompress.py frontend/build
+"""
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Only text-like assets shrink enough to be worth a variant
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.html', '.json', '.map', '.txt', '.svg', '.ico'}
+MIN_SIZE = 512
+
+def precompress(root):
+    written = 0
+    for directory, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(directory, filename)
+            if os.path.splitext(filename)[1] not in COMPRESSIBLE_EXTENSIONS or os.path.getsize(path) < MIN_SIZE:
+                continue
+            with open(path, 'rb') as f:
+                data = f.read()
+
+            variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append(('.br', brotli.compress(data, quality=11)))
+            for suffix, compressed in variants:
+                # Keep a variant only if it actually saves bytes
+                if len(compressed) < len(data):
+                    with open(path + suffix, 'wb') as f:
+                        f.write(compressed)
+                    written += 1
+    return written
+
+if __name__ == '__main__':
+    root = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'frontend', 'build')
+    count = precompress(root)
+    print(f"Wrote {count} compressed assets under {root}" + ('' if brotli else ' (gzip only; install brotli for .br)'))
@@ -0,0 +1,47 @@
+"""Compare two benchmark result files side by side.
+
+    python benchmarks/compare.py results/load-old.json results/load-new.json
+
+Latencies (``*_ms``/``*_us``) that grow and throughput (``rps``) that
+drops by more than ``--threshold`` percent are flagged as regressions.
+"""
+import argparse
+import json
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('baseline')
+    parser.add_argument('candidate')
+    parser.add_argument('--threshold', type=float, default=10.0, help='percent change treated as a regression')
+    args = parser.parse_args()
+
+    baseline, candidate = load(args.baseline), load(args.candidate)
+    if baseline['benchmark'] != candidate['benchmark']:
+        parser.error(f"can't compare a {baseline['benchmark']} run with a {candidate['benchmark']} run")
+    for key in sorted(set(baseline['config']) | set(candidate['config'])):
+        if baseline['config'].get(key) != candidate['config'].get(key):
+            print(f"note: {key} differs ({baseline['config'].get(key)} -> {candidate['config'].get(key)})")
+
+    regressions = 0
+    print(f"{'case':<28}{'metric':<10}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for case, before in baseline['results'].items():
+        after = candidate['results'].get(case)
+        if after is None:
+            continue
+        for metric, old in before.items():
+            new = after.get(metric)
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)) or metric in ('requests', 'errors'):
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            worse = change < -args.threshold if metric == 'rps' else change > args.threshold
+            regressions += worse
+            print(f"{case:<28}{metric:<10}{old:>12}{new:>12}{change:>+9.1f}%{'  <-' if worse else ''}")
+    print(f"{regressions} regression(s) beyond {args.threshold:g}%")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,109 @@
+"""Local stand-in for the Spoonacular endpoints the backend calls.
+
+Answers complexSearch, informationBulk, /recipes/<id>/information and
+/recipes/<id>/nutritionWidget.json with deterministic fake recipes after a
+configurable delay, and fails a configurable share of requests with a 503,
+so benchmarks don't depend on the real API, its latency or its quota.
+
+    python benchmarks/fake_spoonacular.py --port 8765 --latency 0.15 --error-rate 0.02
+"""
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+NUTRIENTS = (('Calories', 'kcal', 400), ('Protein', 'g', 30), ('Fat', 'g', 25), ('Carbohydrates', 'g', 60),
+             ('Fiber', 'g', 10), ('Sugar', 'g', 20), ('Sodium', 'mg', 900))
+
+def fake_recipe(recipe_id, title=None):
+    rng = random.Random(recipe_id)
+    return {
+        'id': recipe_id,
+        'title': title or f'Recipe {recipe_id}',
+        'image': f'https://img.spoonacular.com/recipes/{recipe_id}-312x231.jpg',
+        'nutrition': {'nutrients': [
+            {'name': name, 'amount': round(rng.uniform(0, top), 2), 'unit': unit}
+            for name, unit, top in NUTRIENTS
+        ]}
+    }
+
+class FakeSpoonacular(ThreadingHTTPServer):
+    daemon_threads = True
+    # The load driver opens many connections at once
+    request_queue_size = 1024
+
+    def __init__(self, address, latency=0.0, jitter=0.0, error_rate=0.0, quota=None):
+        super().__init__(address, FakeSpoonacularHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.quota_left = quota
+        self.requests = 0
+        self.lock = threading.Lock()
+
+class FakeSpoonacularHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            if server.quota_left is not None:
+                server.quota_left -= 1
+        time.sleep(max(0.0, server.latency + random.uniform(-server.jitter, server.jitter)))
+
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+        if random.random() < server.error_rate:
+            return self._send(503, {'status': 'failure', 'message': 'injected error'})
+
+        if url.path == '/recipes/complexSearch':
+            query = params.get('query', [''])[0]
+            number = int(params.get('number', ['10'])[0])
+            base = sum(map(ord, query)) * 100
+            return self._send(200, {'results': [fake_recipe(base + i, f'{query.title()} Recipe {i}') for i in range(number)]})
+        if url.path == '/recipes/informationBulk':
+            ids = [int(i) for i in params.get('ids', [''])[0].split(',') if i.isdigit()]
+            return self._send(200, [fake_recipe(recipe_id) for recipe_id in ids])
+        match = re.fullmatch(r'/recipes/(\d+)/information', url.path)
+        if match:
+            return self._send(200, fake_recipe(int(match.group(1))))
+        match = re.fullmatch(r'/recipes/(\d+)/nutritionWidget\.json', url.path)
+        if match:
+            return self._send(200, fake_recipe(int(match.group(1)))['nutrition'])
+        self._send(404, {'status': 'failure', 'message': 'not found'})
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        if self.server.quota_left is not None:
+            self.send_header('X-API-Quota-Request', '1')
+            self.send_header('X-API-Quota-Left', str(self.server.quota_left))
+        self.end_headers()
+        self.wfile.write(data)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.15, help='seconds added to every response')
+    parser.add_argument('--jitter', type=float, default=0.05, help='random +/- seconds on top of --latency')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of requests answered with a 503')
+    parser.add_argument('--quota', type=float, default=None, help='report X-API-Quota-Left counting down from this')
+    args = parser.parse_args()
+
+    server = FakeSpoonacular((args.host, args.port), args.latency, args.jitter, args.error_rate, args.quota)
+    print(f"Fake Spoonacular on http://{args.host}:{server.server_address[1]}", flush=True)
+    server.serve_forever()
+
+if __name__ == '__main__':
+    main()
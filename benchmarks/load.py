@@ -0,0 +1,204 @@
+"""Boot the backend under gunicorn against the fake Spoonacular and drive a mixed workload.
+
+Reports requests per second and p50/p95/p99 latency per endpoint and saves
+them as JSON under benchmarks/results/, so runs can be compared with
+benchmarks/compare.py.
+
+    python benchmarks/load.py --duration 30 --concurrency 32 --latency 0.2
+    python benchmarks/load.py --server uvicorn      # the ASGI entry point instead
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+from results import percentiles, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Popular searches repeat (and hit the cache); the long tail goes upstream
+SEARCH_QUERIES = ['dosa', 'paneer', 'biryani', 'idli', 'samosa', 'dal', 'chai', 'pizza', 'burger', 'pasta',
+                  'salad', 'biriyani', 'panner tikka', 'masala dosa', 'chicken curry', 'smoothie', 'tacos']
+LOCAL_IDS = ['indian_dosa_001', 'indian_idli_001', 'indian_samosa_001', 'indian_biryani_001']
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{process.args[0]} exited with {process.returncode}')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f'nothing listening on port {port} after {timeout}s')
+
+class Workload:
+    """Picks the next request of the mix; one instance per client thread"""
+
+    def __init__(self, mix, seed):
+        self.rng = random.Random(seed)
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+
+    def next_request(self):
+        name = self.rng.choices(self.names, self.weights)[0]
+        rng = self.rng
+        if name == 'search':
+            # Skewed towards the head of the list, like real traffic
+            query = SEARCH_QUERIES[min(int(rng.expovariate(0.25)), len(SEARCH_QUERIES) - 1)]
+            if rng.random() < 0.2:
+                query = f'{query} {rng.randint(1, 10000)}'
+            return name, 'GET', '/api/search?' + urlencode({'query': query}), None
+        if name == 'nutrition':
+            food_id = rng.choice(LOCAL_IDS) if rng.random() < 0.3 else str(rng.randint(1000, 1500))
+            return name, 'GET', '/api/nutrition?' + urlencode({'id': food_id}), None
+        if name == 'nutrition_batch':
+            ids = [str(rng.randint(1000, 3000)) for _ in range(10)] + rng.sample(LOCAL_IDS, 2)
+            return name, 'POST', '/api/nutrition', {'ids': ids}
+        if name == 'log':
+            entry = {'title': rng.choice(SEARCH_QUERIES), 'nutrition': {'calories': rng.randint(50, 800), 'protein': rng.randint(0, 40)}}
+            return name, 'POST', '/api/log-food', entry
+        if name == 'daily_log':
+            return name, 'GET', '/api/daily-log', None
+        if name == 'suggest':
+            return name, 'GET', '/api/suggest?' + urlencode({'prefix': rng.choice(SEARCH_QUERIES)[:rng.randint(1, 4)]}), None
+        raise ValueError(f'unknown endpoint in mix: {name}')
+
+def run_client(port, workload, user, stop_at, record_after, samples, errors, lock):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    local_samples = {}
+    local_errors = {}
+    while True:
+        started = time.perf_counter()
+        if started >= stop_at:
+            break
+        name, method, path, body = workload.next_request()
+        headers = {'X-User-Id': user}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body)
+            headers['Content-Type'] = 'application/json'
+        try:
+            connection.request(method, path, body=payload, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            failed = response.status >= 500
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            failed = True
+        elapsed = time.perf_counter() - started
+        if started < record_after:
+            continue
+        local_samples.setdefault(name, []).append(elapsed)
+        if failed:
+            local_errors[name] = local_errors.get(name, 0) + 1
+    connection.close()
+    with lock:
+        for name, values in local_samples.items():
+            samples.setdefault(name, []).extend(values)
+        for name, count in local_errors.items():
+            errors[name] = errors.get(name, 0) + count
+
+def drive(port, mix, concurrency, duration, warmup, seed):
+    samples, errors, lock = {}, {}, threading.Lock()
+    record_after = time.perf_counter() + warmup
+    stop_at = record_after + duration
+    threads = [
+        threading.Thread(target=run_client, args=(
+            port, Workload(mix, seed + i), f'bench-{i % 8}', stop_at, record_after, samples, errors, lock
+        ))
+        for i in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    results = {}
+    for name, values in sorted(samples.items()):
+        results[name] = {'requests': len(values), 'errors': errors.get(name, 0), 'rps': round(len(values) / duration, 1), **percentiles(values)}
+    every = [value for values in samples.values() for value in values]
+    results['all'] = {'requests': len(every), 'errors': sum(errors.values()), 'rps': round(len(every) / duration, 1), **percentiles(every)}
+    return results
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--server', choices=('gunicorn', 'uvicorn'), default='gunicorn')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--duration', type=float, default=20, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='unmeasured seconds before that')
+    parser.add_argument('--latency', type=float, default=0.15, help='fake Spoonacular response time')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='share of fake Spoonacular 503s')
+    parser.add_argument('--mix', type=parse_mix, default='search=5,nutrition=2,nutrition_batch=1,log=2,daily_log=2,suggest=3',
+                        help='endpoint weights, e.g. search=5,log=1')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default benchmarks/results/load-<time>.json)')
+    args = parser.parse_args()
+
+    upstream_port, app_port = free_port(), free_port()
+    data_dir = tempfile.mkdtemp(prefix='calorie-bench-')
+    env = {
+        **os.environ,
+        'SPOONACULAR_BASE_URL': f'http://127.0.0.1:{upstream_port}',
+        'SPOONACULAR_API_KEY': 'benchmark',
+        'DATA_DIR': data_dir,
+        'FLASK_ENV': 'production',
+        'WARMUP_INTERVAL': '0',
+        # Measure the app, not the quota governor shedding the long tail
+        'UPSTREAM_DAILY_QUOTA': '0',
+        'LOG_LEVEL': 'warning'
+    }
+    upstream = subprocess.Popen([
+        sys.executable, os.path.join(ROOT, 'benchmarks', 'fake_spoonacular.py'), '--port', str(upstream_port),
+        '--latency', str(args.latency), '--error-rate', str(args.error_rate)
+    ], stdout=subprocess.DEVNULL)
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-b', f'127.0.0.1:{app_port}',
+                   '--log-level', 'warning', 'backend.app:app']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', '--workers', str(args.workers), '--port', str(app_port),
+                   '--log-level', 'warning', 'backend.app:asgi_app']
+    app = subprocess.Popen(command, cwd=ROOT, env=env)
+    try:
+        wait_for_port(upstream_port, upstream)
+        wait_for_port(app_port, app)
+        print(f"Driving {args.server} ({args.workers} workers) with {args.concurrency} clients for {args.duration:g}s...", flush=True)
+        results = drive(app_port, args.mix, args.concurrency, args.duration, args.warmup, args.seed)
+    finally:
+        app.terminate()
+        upstream.terminate()
+        app.wait(timeout=30)
+        upstream.wait(timeout=30)
+
+    print(f"{'endpoint':<16}{'requests':>9}{'errors':>8}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, row in results.items():
+        print(f"{name:<16}{row['requests']:>9}{row['errors']:>8}{row['rps']:>9}{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}")
+
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    path = save_results('load', config, results, args.output)
+    print(f"Saved {path}")
+
+if __name__ == '__main__':
+    main()
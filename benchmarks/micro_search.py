@@ -0,0 +1,93 @@
+"""Microbenchmarks for search_indian_foods at growing catalog sizes.
+
+Synthetic catalogs are made by combining the words of the real Indian
+foods catalog, then indexed exactly like the live one. Each query kind
+(exact title, single word, prefix, misspelling, no match) is timed
+separately because they take different paths through the index.
+
+    python benchmarks/micro_search.py --sizes 60,1000,10000,50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep the benchmark's caches and compiled catalog out of the real data dir
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='calorie-bench-'))
+os.environ.setdefault('WARMUP_INTERVAL', '0')
+os.environ.setdefault('LOG_LEVEL', 'warning')
+# The synthetic catalogs must not be swapped for the real file mid-run
+os.environ.setdefault('CATALOG_CHECK_INTERVAL', '0')
+
+from backend import app as backend  # noqa: E402
+from results import percentiles, save_results  # noqa: E402
+
+def synthetic_catalog(base, size, rng):
+    """``size`` foods: the real ones, then made-up combinations of their words"""
+    foods = dict(list(base.items())[:size])
+    words = sorted({word for key in base for word in key.split()})
+    while len(foods) < size:
+        key = ' '.join(rng.sample(words, rng.randint(2, 4)))
+        if key in foods:
+            continue
+        template = rng.choice(list(base.values()))
+        foods[key] = {**template, 'id': f'indian_{key.replace(" ", "_")}_{len(foods):05d}', 'title': key.title()}
+    return foods
+
+def misspell(word, rng):
+    position = rng.randrange(len(word))
+    return word[:position] + rng.choice('aeiou') + word[position + 1:]
+
+def query_sets(foods, rng, count):
+    keys = list(foods)
+    words = sorted({word for key in keys for word in key.split() if len(word) > 3})
+    return {
+        'exact': [foods[rng.choice(keys)]['title'] for _ in range(count)],
+        'word': [rng.choice(words) for _ in range(count)],
+        'prefix': [rng.choice(words)[:3] for _ in range(count)],
+        'typo': [misspell(rng.choice(words), rng) for _ in range(count)],
+        'miss': [f'zzq{rng.randint(0, 999)}' for _ in range(count)]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='60,1000,10000,50000', help='comma-separated catalog sizes')
+    parser.add_argument('--queries', type=int, default=300, help='queries timed per kind and size')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='results file (default benchmarks/results/micro_search-<time>.json)')
+    args = parser.parse_args()
+
+    with open(backend.CATALOG_PATH, encoding='utf-8') as f:
+        base = json.load(f)
+
+    results = {}
+    print(f"{'case':<24}{'mean us':>10}{'p50 us':>10}{'p95 us':>10}{'p99 us':>10}")
+    for size in (int(size) for size in args.sizes.split(',')):
+        rng = random.Random(args.seed)
+        foods = synthetic_catalog(base, size, rng)
+        started = time.perf_counter()
+        backend.load_indian_foods(backend.FoodCatalog(backend.FoodCatalog.compile(foods)))
+        build_seconds = time.perf_counter() - started
+        results[f'size={size}/build'] = {'build_ms': round(build_seconds * 1e3, 3)}
+        print(f"size={size}: index built in {build_seconds * 1e3:.1f} ms")
+
+        for kind, queries in query_sets(foods, rng, args.queries).items():
+            timings = []
+            for query in queries:
+                started = time.perf_counter()
+                backend.search_indian_foods(query)
+                timings.append(time.perf_counter() - started)
+            row = percentiles(timings, unit='us')
+            results[f'size={size}/{kind}'] = row
+            print(f"{f'size={size}/{kind}':<24}{row['mean_us']:>10}{row['p50_us']:>10}{row['p95_us']:>10}{row['p99_us']:>10}")
+
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    print(f"Saved {save_results('micro_search', config, results, args.output)}")
+
+if __name__ == '__main__':
+    main()
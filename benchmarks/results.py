@@ -0,0 +1,51 @@
+"""Shared result format for the benchmarks: one JSON file per run."""
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+def percentiles(seconds, unit='ms'):
+    """Mean and p50/p95/p99 of ``seconds``, in ``unit`` ('ms' or 'us')"""
+    if not seconds:
+        return {f'{name}_{unit}': None for name in ('mean', 'p50', 'p95', 'p99')}
+    scale = 1e3 if unit == 'ms' else 1e6
+    ordered = sorted(seconds)
+
+    def rank(share):
+        return round(ordered[min(len(ordered) - 1, int(share * len(ordered)))] * scale, 3)
+
+    return {
+        f'mean_{unit}': round(sum(ordered) / len(ordered) * scale, 3),
+        f'p50_{unit}': rank(0.50),
+        f'p95_{unit}': rank(0.95),
+        f'p99_{unit}': rank(0.99)
+    }
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def save_results(benchmark, config, results, path=None):
+    """Write a run to ``path`` (default results/<benchmark>-<time>.json) and return the path"""
+    started = datetime.datetime.now()
+    if path is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        path = os.path.join(RESULTS_DIR, f"{benchmark}-{started.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, 'w') as f:
+        json.dump({
+            'benchmark': benchmark,
+            'created_at': started.isoformat(timespec='seconds'),
+            'git_revision': _git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'config': config,
+            'results': results
+        }, f, indent=2)
+    return path
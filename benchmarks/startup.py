@@ -0,0 +1,131 @@
+"""Time how long the backend takes to become ready to serve.
+
+Two measurements:
+
+* ``import``: fresh interpreters importing backend.app, calling
+  create_app() and answering a first request that needs the food catalog,
+  each stage timed separately (interpreter start-up itself is excluded).
+* ``gunicorn``: real workers booted with and without ``--preload``; a
+  gunicorn hook records each worker's time from fork to ready to accept
+  requests, and the whole server's time until every worker is up.
+
+    python benchmarks/startup.py --runs 10 --workers 4
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from load import free_port
+from results import percentiles, save_results
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_PROBE = '''
+import json, time
+started = time.perf_counter()
+import backend.app as backend
+imported = time.perf_counter()
+app = backend.create_app(preload={preload})
+created = time.perf_counter()
+response = app.test_client().get('/api/nutrition?id=indian_dosa_001')
+assert response.status_code == 200, response.status_code
+answered = time.perf_counter()
+print(json.dumps({{'import': imported - started, 'create_app': created - imported, 'first_request': answered - created}}))
+'''
+
+# Loaded by gunicorn with -c; post_fork and post_worker_init both run in the worker
+GUNICORN_HOOKS = '''
+import json, os, time
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+def post_worker_init(worker):
+    with open(os.environ['STARTUP_TIMINGS'], 'a') as f:
+        f.write(json.dumps({'boot': time.perf_counter() - worker.forked_at, 'ready_at': time.time()}) + '\\n')
+'''
+
+def bench_env(data_dir):
+    return {
+        **os.environ,
+        'DATA_DIR': data_dir,
+        'FLASK_ENV': 'production',
+        'WARMUP_INTERVAL': '0',
+        'LOG_LEVEL': 'warning'
+    }
+
+def time_imports(runs, preload, env):
+    stages = {'import': [], 'create_app': [], 'first_request': []}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_PROBE.format(preload=preload)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True
+        ).stdout
+        for stage, seconds in json.loads(output.splitlines()[-1]).items():
+            stages[stage].append(seconds)
+    return {stage: percentiles(values) for stage, values in stages.items()}
+
+def time_gunicorn(runs, workers, preload, env, timeout=60):
+    boots, totals = [], []
+    with tempfile.TemporaryDirectory() as scratch:
+        hooks = os.path.join(scratch, 'hooks.py')
+        with open(hooks, 'w') as f:
+            f.write(GUNICORN_HOOKS)
+        for run in range(runs):
+            timings = os.path.join(scratch, f'timings-{run}.jsonl')
+            port = free_port()
+            command = [sys.executable, '-m', 'gunicorn', '-c', hooks, '-w', str(workers), '-b', f'127.0.0.1:{port}',
+                       '--log-level', 'warning']
+            if preload:
+                command += ['--preload', 'backend.app:create_app(preload=True)']
+            else:
+                command += ['backend.app:create_app()']
+            started = time.time()
+            server = subprocess.Popen(command, cwd=ROOT, env={**env, 'STARTUP_TIMINGS': timings})
+            try:
+                deadline = time.monotonic() + timeout
+                lines = []
+                while len(lines) < workers:
+                    if server.poll() is not None or time.monotonic() > deadline:
+                        raise RuntimeError(f'gunicorn did not boot {workers} workers')
+                    time.sleep(0.02)
+                    if os.path.exists(timings):
+                        with open(timings) as f:
+                            lines = [json.loads(line) for line in f if line.strip()]
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+            boots.extend(line['boot'] for line in lines)
+            totals.append(max(line['ready_at'] for line in lines) - started)
+    return {'worker_boot': percentiles(boots), 'all_workers_ready': percentiles(totals)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=10, help='interpreters or servers started per case')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers per server')
+    parser.add_argument('--skip-gunicorn', action='store_true', help='only time the import in fresh interpreters')
+    parser.add_argument('--output', help='results file (default benchmarks/results/startup-<time>.json)')
+    args = parser.parse_args()
+
+    env = bench_env(tempfile.mkdtemp(prefix='calorie-bench-'))
+    results = {}
+    for preload in (False, True):
+        for stage, row in time_imports(args.runs, preload, env).items():
+            results[f'import/preload={preload}/{stage}'] = row
+        if not args.skip_gunicorn:
+            for stage, row in time_gunicorn(args.runs, args.workers, preload, env).items():
+                results[f'gunicorn/preload={preload}/{stage}'] = row
+
+    print(f"{'case':<44}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, row in results.items():
+        print(f"{name:<44}{row['mean_ms']:>10}{row['p50_ms']:>10}{row['p95_ms']:>10}")
+
+    config = {key: value for key, value in vars(args).items() if key != 'output'}
+    print(f"Saved {save_results('startup', config, results, args.output)}")
+
+if __name__ == '__main__':
+    main()
@@ -5,4 +5,6 @@ npm install
 npm run build
 cd ..
 echo "Installing Python dependencies..."
-pip install -r requirements.txt
\ No newline at end of file
+pip install -r requirements.txt
+echo "Precompressing frontend assets..."
+python backend/precompress.py frontend/build
\ No newline at end of file
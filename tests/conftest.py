@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+# Keep the tests' databases, caches and metrics out of the real data dir,
+# and never let background work reach Spoonacular or swap the catalog
+os.environ.setdefault('DATA_DIR', tempfile.mkdtemp(prefix='calorie-tests-'))
+os.environ.setdefault('WARMUP_INTERVAL', '0')
+os.environ.setdefault('CATALOG_CHECK_INTERVAL', '0')
+os.environ.setdefault('LOG_LEVEL', 'warning')
+os.environ.setdefault('SPOONACULAR_BASE_URL', 'http://127.0.0.1:9')
@@ -0,0 +1,89 @@
+"""Incremental FoodSearchIndex rebuilds against building from scratch."""
+import json
+import random
+
+import pytest
+
+from backend import app as backend
+
+def build(foods, previous=None):
+    return backend.FoodSearchIndex(backend.FoodCatalog(backend.FoodCatalog.compile(foods)), previous=previous)
+
+def postings(mapping):
+    return {term: list(ordinals) for term, ordinals in mapping.items()}
+
+def vocabulary(index):
+    return dict(zip(index._vocabulary, index._vocabulary_gram_counts))
+
+def add_foods(foods, rng):
+    edited = dict(foods)
+    for number in range(5):
+        edited[f'test dish {number}'] = {**rng.choice(list(foods.values())), 'id': f'indian_test_{number}', 'title': f'Test Dish {number}'}
+    return edited
+
+def remove_foods(foods, rng):
+    dropped = set(rng.sample(list(foods), 5))
+    return {food_key: food_data for food_key, food_data in foods.items() if food_key not in dropped}
+
+def retitle_foods(foods, rng):
+    edited = dict(foods)
+    for food_key in rng.sample(list(foods), 5):
+        edited[food_key] = {**foods[food_key], 'title': foods[food_key]['title'] + ' Special'}
+    return edited
+
+def change_nutrition_only(foods, rng):
+    edited = dict(foods)
+    for food_key in rng.sample(list(foods), 5):
+        edited[food_key] = {**foods[food_key], 'nutrition': {**foods[food_key]['nutrition'], 'calories': 1}}
+    return edited
+
+def reorder_foods(foods, rng):
+    items = list(foods.items())
+    rng.shuffle(items)
+    return dict(items)
+
+def everything(foods, rng):
+    return reorder_foods(retitle_foods(remove_foods(add_foods(foods, rng), rng), rng), rng)
+
+@pytest.fixture(scope='module')
+def foods():
+    with open(backend.CATALOG_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+@pytest.mark.parametrize('edit', [add_foods, remove_foods, retitle_foods, change_nutrition_only, reorder_foods, everything])
+def test_incremental_rebuild_equals_full_build(foods, edit):
+    edited = edit(foods, random.Random(3))
+    incremental = build(edited, previous=build(foods))
+    full = build(edited)
+
+    assert incremental._key_prefix_lengths == full._key_prefix_lengths
+    assert postings(incremental._grams) == postings(full._grams)
+    assert postings(incremental._tokens) == postings(full._tokens)
+    # Word ids follow insertion order, which may differ; the words may not
+    assert vocabulary(incremental) == vocabulary(full)
+    for query in ('dosa', 'paneer', 'special', 'test dish', 'biriyani', 'masala do', ''):
+        assert incremental.search(query, limit=len(edited)) == full.search(query, limit=len(edited)), query
+        assert incremental.fuzzy_search(query) == full.fuzzy_search(query), query
+    for food_data in edited.values():
+        assert incremental.get_by_id(food_data['id']) == full.get_by_id(food_data['id'])
+
+def test_only_new_or_retitled_entries_are_reindexed(foods):
+    previous = build(foods)
+    assert build(change_nutrition_only(foods, random.Random(3)), previous=previous).reindexed == 0
+    assert build(retitle_foods(foods, random.Random(3)), previous=previous).reindexed == 5
+    assert build(add_foods(foods, random.Random(3)), previous=previous).reindexed == 5
+
+def test_a_failed_reload_is_logged_not_echoed(monkeypatch):
+    def broken_reload():
+        raise ValueError('Expecting value: /srv/private/indian_foods.json line 3 column 1')
+
+    logged = []
+    monkeypatch.setenv('ADMIN_TOKEN', 'admin-secret')
+    monkeypatch.setattr(backend, 'reload_indian_foods', broken_reload)
+    monkeypatch.setattr(backend.log, 'exception', lambda message, *args, **kwargs: logged.append(message))
+
+    response = backend.app.test_client().post('/api/admin/reload-catalog', headers={'X-Admin-Token': 'admin-secret'})
+
+    assert response.status_code == 500
+    assert response.json == {'error': 'Catalog reload failed, keeping the current catalog'}
+    assert logged == ['Catalog reload failed, keeping the current catalog']
@@ -0,0 +1,65 @@
+"""ContentStore: trigger-kept totals match the tables, and eviction keeps under max_bytes."""
+import pytest
+
+from backend import app as backend
+
+def counted_usage(store):
+    """What ``usage()`` should say, summed from the tables themselves"""
+    conn = store.db.connection()
+    entries, key_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(LENGTH(key) + 48), 0) FROM entries').fetchone()
+    blobs, blob_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM blobs').fetchone()
+    return {'entries': entries, 'blobs': blobs, 'bytes': key_bytes + blob_bytes}
+
+@pytest.fixture
+def store(tmp_path):
+    return backend.ContentStore(str(tmp_path / 'content.sqlite3'), max_bytes=1 << 20)
+
+def test_usage_matches_the_tables_through_every_change(store):
+    dosa = [{'id': 1, 'title': 'Dosa', 'nutrition': {'calories': 168}}]
+    store.set('search:dosa', dosa, ttl=60)
+    store.set('search:masala dosa', dosa, ttl=60)
+    assert store.usage() == counted_usage(store)
+    # Same value under two keys: one blob
+    assert store.usage()['blobs'] == 1
+
+    # Rewriting an unchanged value, then changing it
+    store.set('search:dosa', dosa, ttl=60)
+    assert store.usage() == counted_usage(store)
+    store.set('search:dosa', dosa + [{'id': 2, 'title': 'Plain Dosa'}], ttl=60)
+    assert store.usage() == counted_usage(store) and store.usage()['blobs'] == 2
+
+    store.set('search:idli', [], ttl=-1)
+    assert store.get('search:idli') is None
+    store.delete('search:masala dosa')
+    assert store.usage() == counted_usage(store)
+
+    # Drops the expired entry and the blobs nothing points at any more
+    store.evict()
+    assert store.usage() == counted_usage(store)
+    assert (store.usage()['entries'], store.usage()['blobs']) == (1, 1)
+    store.clear()
+    assert store.usage() == counted_usage(store) == {'entries': 0, 'blobs': 0, 'bytes': 0}
+
+def test_eviction_keeps_the_store_under_max_bytes(tmp_path):
+    store = backend.ContentStore(str(tmp_path / 'content.sqlite3'), max_bytes=20000)
+    store.EVICT_EVERY = 10 ** 6
+    for number in range(200):
+        store.set(f'nutrition:{number}', {'recipe': number, 'notes': 'x' * 400}, ttl=60)
+    assert store.usage()['bytes'] > 20000
+
+    store.evict()
+
+    usage = store.usage()
+    assert usage == counted_usage(store)
+    assert 0 < usage['bytes'] <= 20000
+    # Least recently used go first
+    assert store.get('nutrition:199') is not None
+    assert store.get('nutrition:0') is None
+
+def test_writes_evict_every_few_sets(tmp_path):
+    store = backend.ContentStore(str(tmp_path / 'content.sqlite3'), max_bytes=5000)
+    store.EVICT_EVERY = 8
+    for number in range(64):
+        store.set(f'nutrition:{number}', {'recipe': number, 'notes': 'x' * 400}, ttl=60)
+    assert store.usage() == counted_usage(store)
+    assert store.usage()['bytes'] <= 5000
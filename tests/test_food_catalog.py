@@ -0,0 +1,61 @@
+"""FoodCatalog image lookups: key, id and title tables, and stale images."""
+import json
+import os
+
+import pytest
+
+from backend import app as backend
+
+FOODS = {
+    'dosa': {'id': 'indian_dosa_001', 'title': 'Dosa', 'image': 'dosa.jpg', 'nutrition': {'calories': 168}},
+    'masala dosa': {'id': 'indian_masala_dosa_001', 'title': 'Masala Dosa', 'nutrition': {'calories': 250.5}},
+    'plain dosa': {'id': 'indian_plain_dosa_001', 'title': 'DOSA', 'nutrition': {'calories': 160}},
+    'crème brûlée': {'id': 'indian_duplicate_001', 'title': 'Crème Brûlée', 'nutrition': {'protein': 4}},
+    'duplicate': {'id': 'indian_duplicate_001', 'title': 'Duplicate', 'nutrition': {}},
+}
+
+@pytest.fixture
+def catalog():
+    return backend.FoodCatalog(backend.FoodCatalog.compile(FOODS))
+
+def test_lookups_find_every_entry(catalog):
+    for ordinal, food_key in enumerate(FOODS):
+        assert catalog.ordinal(food_key) == ordinal
+        assert catalog[food_key]['title'] == FOODS[food_key]['title']
+    assert catalog.ordinal('idli') is None
+    with pytest.raises(KeyError):
+        catalog['idli']
+    assert 'idli' not in catalog and 'dosa' in catalog
+
+def test_titles_match_case_insensitively(catalog):
+    assert catalog.title_ordinals('dosa') == [0, 2]
+    assert catalog.title_ordinals('CRÈME BRÛLÉE') == [3]
+    assert catalog.title_ordinals('dos') == []
+
+def test_repeated_id_resolves_to_the_last_entry(catalog):
+    # As the {id: ordinal} dict it replaces did
+    assert catalog.ordinal_of_id('indian_duplicate_001') == 4
+    assert catalog.ordinal_of_id('indian_idli_001') is None
+
+def test_records_read_back(catalog):
+    assert catalog['dosa'] == {'id': 'indian_dosa_001', 'title': 'Dosa', 'image': 'dosa.jpg', 'nutrition': {'calories': 168, 'protein': 0}}
+    assert catalog['masala dosa']['nutrition']['calories'] == 250.5
+    # Offsets count bytes: 'è' takes two
+    assert catalog.find(3, 0, 'brû'.encode('utf-8')) == 7
+    assert catalog.find(3, 4, b'CR') == -1
+
+def test_empty_catalog():
+    catalog = backend.FoodCatalog(backend.FoodCatalog.compile({}))
+    assert len(catalog) == 0 and catalog.ordinal('dosa') is None and catalog.title_ordinals('dosa') == []
+
+def test_an_image_in_an_older_format_is_recompiled(tmp_path):
+    json_path, compiled_path = tmp_path / 'foods.json', tmp_path / 'foods.catalog'
+    json_path.write_text(json.dumps(FOODS), encoding='utf-8')
+    stale = backend.FoodCatalog.compile(FOODS).replace(backend.FoodCatalog.MAGIC, b'FOODCAT1', 1)
+    compiled_path.write_bytes(stale)
+
+    catalog = backend.FoodCatalog.load(str(json_path), str(compiled_path))
+
+    assert catalog.ordinal('plain dosa') == 2
+    assert compiled_path.read_bytes().startswith(backend.FoodCatalog.MAGIC)
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.tmp')]
@@ -0,0 +1,72 @@
+"""FoodLogStore group commits: one transaction per batch, and a bad entry only fails its own caller."""
+import threading
+import time
+
+import pytest
+
+from backend import app as backend
+
+def entry(title, timestamp='2026-01-05T12:00:00', calories=100):
+    return {'title': title, 'timestamp': timestamp, 'nutrition': {'calories': calories}}
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+@pytest.fixture
+def store(tmp_path):
+    return backend.FoodLogStore(str(tmp_path / 'food_log.sqlite3'))
+
+def append_as_one_batch(store, entries):
+    """Queue every entry behind a held commit lock, so one thread commits them all together"""
+    outcomes = [None] * len(entries)
+
+    def append(position, user_id, food_entry):
+        try:
+            store.append(user_id, food_entry)
+            outcomes[position] = 'ok'
+        except Exception as e:
+            outcomes[position] = e
+
+    with store._commit_lock:
+        threads = [threading.Thread(target=append, args=(position, *item)) for position, item in enumerate(entries)]
+        for thread in threads:
+            thread.start()
+        wait_for(lambda: len(store._pending) == len(entries))
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+def test_a_batch_commits_every_entry(store):
+    outcomes = append_as_one_batch(store, [('alice', entry(f'dish {n}')) for n in range(5)] + [('bob', entry('naan'))])
+
+    assert outcomes == ['ok'] * 6
+    assert len(store.entries('alice', '2026-01-05', '2026-01-06')) == 5
+    assert store.totals('day', 'alice', '2026-01-05', '2026-01-05')['2026-01-05'][:2] == (5, 500)
+    assert store.totals('day', 'bob', '2026-01-05', '2026-01-05')['2026-01-05'][:2] == (1, 100)
+
+def test_a_bad_entry_only_fails_its_own_caller(store):
+    broken = {'title': 'no timestamp', 'nutrition': {'calories': 50}}
+    outcomes = append_as_one_batch(store, [('alice', entry('dosa')), ('alice', broken), ('bob', entry('idli'))])
+
+    # The batch is retried one entry at a time once its transaction fails
+    assert outcomes[0] == outcomes[2] == 'ok'
+    assert isinstance(outcomes[1], KeyError)
+    assert [food['title'] for food in store.entries('alice', '2026-01-01', '2027-01-01')] == ['dosa']
+    assert [food['title'] for food in store.entries('bob', '2026-01-01', '2027-01-01')] == ['idli']
+    assert store.totals('day', 'alice', '2026-01-01', '2027-01-01')['2026-01-05'][:2] == (1, 100)
+
+def test_every_bad_entry_gets_its_own_error(store):
+    outcomes = append_as_one_batch(store, [('alice', {'title': 'no timestamp'}), ('bob', {**entry('dosa'), 'timestamp': 'yesterday'})])
+
+    assert isinstance(outcomes[0], KeyError) and isinstance(outcomes[1], ValueError)
+    assert store.db.connection().execute('SELECT COUNT(*) FROM food_entries').fetchone() == (0,)
+    assert store.db.connection().execute('SELECT COUNT(*) FROM daily_totals').fetchone() == (0,)
+
+def test_the_store_keeps_working_after_a_failed_batch(store):
+    append_as_one_batch(store, [('alice', {'title': 'no timestamp'})])
+    store.append('alice', entry('dosa'))
+
+    assert [food['title'] for food in store.entries('alice', '2026-01-01', '2027-01-01')] == ['dosa']
@@ -0,0 +1,38 @@
+"""Typo-tolerant search: misspellings still match, and long queries stay cheap."""
+import random
+import time
+
+import pytest
+
+from backend import app as backend
+
+@pytest.fixture(scope='module')
+def index():
+    return backend.current_food_index()
+
+def misspelt_query(index, words, seed=5):
+    rng = random.Random(seed)
+    vocabulary = sorted({word for food_key in index.catalog for word in food_key.split() if len(word) > 3})
+    misspelt = []
+    for _ in range(words):
+        word = rng.choice(vocabulary)
+        position = rng.randrange(len(word))
+        misspelt.append(word[:position] + 'q' + word[position + 1:])
+    return ' '.join(misspelt)
+
+def test_misspelt_words_find_the_dish(index):
+    assert 'indian_biryani_001' in [food_data['id'] for food_data in index.fuzzy_search('biriyani')]
+    assert 'indian_paneer_butter_masala_001' in [food_data['id'] for food_data in index.fuzzy_search('panner buter masala')]
+
+def test_only_the_first_distinct_query_words_count(index):
+    words = misspelt_query(index, 40).split()
+    first = list(dict.fromkeys(words))[:index.MAX_FUZZY_QUERY_WORDS]
+    assert index.fuzzy_search(' '.join(words)) == index.fuzzy_search(' '.join(first))
+    assert index.fuzzy_search('panner panner tika') == index.fuzzy_search('panner tika')
+
+def test_long_typo_query_is_bounded(index):
+    query = misspelt_query(index, 200)[:1000]
+    started = time.perf_counter()
+    backend.search_indian_foods(query)
+    # Unbounded, this took minutes; the bounded walk takes milliseconds
+    assert time.perf_counter() - started < 0.25
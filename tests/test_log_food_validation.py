@@ -0,0 +1,43 @@
+"""Food log routes: NaN and Infinity, which JSON parsing accepts, never reach the log."""
+import pytest
+
+from backend import app as backend
+
+@pytest.fixture
+def client():
+    return backend.app.test_client()
+
+def logged_titles(client, user):
+    response = client.get('/api/daily-log?start=2026-01-01&end=2026-12-31&format=ndjson', headers={'X-User-Id': user})
+    return [line for line in response.get_data(as_text=True).splitlines() if line]
+
+def test_ndjson_import_logs_the_valid_lines_and_reports_the_bad_one(client):
+    body = (
+        '{"title": "dosa", "timestamp": "2026-01-05T08:00:00", "nutrition": {"calories": 168}}\n'
+        '{"title": "broken", "timestamp": "2026-01-05T09:00:00", "nutrition": {"calories": NaN}}\n'
+        '{"title": "idli", "timestamp": "2026-01-05T10:00:00", "nutrition": {"protein": -Infinity}}\n'
+        '{"title": "naan", "timestamp": "2026-01-05T12:00:00", "nutrition": {"calories": 285}}\n'
+    )
+    response = client.post('/api/log-food/bulk', data=body, content_type='application/x-ndjson', headers={'X-User-Id': 'nan-import'})
+
+    assert response.status_code == 200
+    assert response.json['logged'] == 2
+    assert response.json['errors'] == [
+        {'index': 1, 'error': 'nutrition.calories must be a finite number'},
+        {'index': 2, 'error': 'nutrition.protein must be a finite number'}
+    ]
+    assert len(logged_titles(client, 'nan-import')) == 2
+
+def test_single_entry_with_infinite_calories_is_rejected(client):
+    response = client.post(
+        '/api/log-food', data='{"title": "dosa", "nutrition": {"calories": Infinity}}',
+        content_type='application/json', headers={'X-User-Id': 'nan-single'}
+    )
+    assert response.status_code == 400
+    assert response.json == {'error': 'nutrition.calories must be a finite number'}
+
+def test_totals_count_non_finite_amounts_as_zero(tmp_path):
+    store = backend.FoodLogStore(str(tmp_path / 'food_log.sqlite3'))
+    store.append('alice', {'title': 'dosa', 'timestamp': '2026-01-05T08:00:00', 'nutrition': {'calories': float('nan'), 'protein': 4}})
+
+    assert store.totals('day', 'alice', '2026-01-05', '2026-01-05')['2026-01-05'][:3] == (1, 0, 4)
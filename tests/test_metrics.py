@@ -0,0 +1,41 @@
+"""MetricsRegistry snapshots: merged across workers, dropped only once their worker is gone."""
+import json
+import os
+import subprocess
+import sys
+import time
+
+from backend import app as backend
+
+def write_snapshot(directory, filename, requests, age):
+    path = directory / filename
+    path.write_text(json.dumps({'counters': [['requests_total', [], requests]], 'gauges': [], 'histograms': []}))
+    stamp = time.time() - age
+    os.utime(path, (stamp, stamp))
+    return path
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+def test_idle_live_workers_keep_counting(tmp_path):
+    registry = backend.MetricsRegistry(str(tmp_path))
+    idle = write_snapshot(tmp_path, f'{os.getppid()}.json', 7, backend.MetricsRegistry.SNAPSHOT_MAX_AGE + 60)
+    recent = write_snapshot(tmp_path, f'{dead_pid()}.json', 5, 0)
+
+    counters, _, _ = registry._merged_snapshots()
+
+    assert counters[('requests_total', ())] == 12
+    assert idle.exists() and recent.exists()
+
+def test_old_snapshots_of_gone_workers_are_removed(tmp_path):
+    registry = backend.MetricsRegistry(str(tmp_path))
+    age = backend.MetricsRegistry.SNAPSHOT_MAX_AGE + 60
+    gone = write_snapshot(tmp_path, f'{dead_pid()}.json', 7, age)
+    leftover = write_snapshot(tmp_path, f'{os.getppid()}.json.tmp', 3, age)
+
+    counters, _, _ = registry._merged_snapshots()
+
+    assert counters[('requests_total', ())] == 0
+    assert not gone.exists() and not leftover.exists()
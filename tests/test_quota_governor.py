@@ -0,0 +1,87 @@
+"""QuotaGovernor: users spend the day's quota, background calls keep their reserve."""
+import threading
+
+import pytest
+
+from backend import app as backend
+
+Governor = backend.QuotaGovernor
+
+@pytest.fixture
+def governor(tmp_path):
+    # 100 points a day; the bucket refills ~0.001 points a second, too slow to matter here
+    return Governor(str(tmp_path / 'quota.sqlite3'), daily_quota=100, burst=10)
+
+def calls_allowed(governor, priority, cost=1.0, most=1000):
+    for allowed in range(most):
+        try:
+            governor.acquire(cost, priority)
+        except backend.QuotaExhausted:
+            return allowed
+    return most
+
+def test_users_may_spend_the_whole_day(governor):
+    # The bucket empties after 10 calls; users ignore it
+    assert calls_allowed(governor, Governor.INTERACTIVE) == 100
+    assert governor.remaining()[1] == 0
+    with pytest.raises(backend.QuotaExhausted, match='used up'):
+        governor.acquire()
+
+def test_warmup_stops_at_its_reserve(governor):
+    # 30% of the 10-point bucket stays untouched
+    assert calls_allowed(governor, Governor.WARMUP) == 7
+    assert governor.remaining()[0] == pytest.approx(3, abs=0.01)
+    # Users can still spend what warm-up left behind
+    governor.acquire(priority=Governor.INTERACTIVE)
+
+def test_prefetch_is_shed_before_warmup(governor):
+    assert calls_allowed(governor, Governor.SPECULATIVE) == 5
+    assert calls_allowed(governor, Governor.WARMUP) == 2
+
+def test_background_calls_leave_the_days_reserve(tmp_path):
+    governor = Governor(str(tmp_path / 'quota.sqlite3'), daily_quota=100, burst=1000)
+    # 70 of the day's 100 points, whatever the bucket holds
+    assert calls_allowed(governor, Governor.WARMUP) == 70
+
+def test_spoonacular_headers_correct_the_count(governor):
+    governor.acquire(1.0)
+    governor.record_response({'X-API-Quota-Request': '3.5', 'X-API-Quota-Left': '42'}, estimated_cost=1.0)
+
+    tokens, quota_left = governor.remaining()
+    assert quota_left == 42
+    # Charged 2.5 more than estimated
+    assert tokens == pytest.approx(10 - 3.5, abs=0.01)
+
+def test_missing_or_garbled_headers_change_nothing(governor):
+    governor.acquire(1.0)
+    before = governor.remaining()
+    governor.record_response({}, estimated_cost=1.0)
+    governor.record_response({'X-API-Quota-Left': 'n/a'}, estimated_cost=1.0)
+    assert governor.remaining() == pytest.approx(before, abs=0.01)
+
+def test_disabled_governor_never_sheds(tmp_path):
+    governor = Governor(str(tmp_path / 'quota.sqlite3'), daily_quota=0, burst=0)
+    assert calls_allowed(governor, Governor.SPECULATIVE, most=20) == 20
+
+def test_users_do_not_join_a_warmup_call_that_gets_shed(monkeypatch):
+    entered, release = threading.Event(), threading.Event()
+
+    def shed_warmup(query, priority):
+        entered.set()
+        release.wait(5)
+        raise backend.QuotaExhausted('shed warmup call')
+
+    warmup = threading.Thread(
+        target=lambda: pytest.raises(
+            backend.QuotaExhausted, backend.search_flight.do, (Governor.WARMUP, 'dosa'), shed_warmup, 'dosa', Governor.WARMUP
+        )
+    )
+    warmup.start()
+    assert entered.wait(5)
+    monkeypatch.setattr(backend, 'refresh_search_cache', lambda query: [{'id': 1, 'title': query}])
+    try:
+        # Runs its own interactive call instead of waiting for the warm-up one
+        assert backend.fetch_spoonacular_results('dosa') == [{'id': 1, 'title': 'dosa'}]
+    finally:
+        release.set()
+        warmup.join(5)
@@ -0,0 +1,76 @@
+"""FoodSearchIndex.search against the linear scan it replaced."""
+import json
+import random
+
+import pytest
+
+from backend import app as backend
+
+def linear_scan(foods, query):
+    """Keys the original search_indian_foods matched, before its 10-result cut"""
+    query = query.lower().strip()
+    return {
+        food_key for food_key, food_data in foods.items()
+        if query in food_key or food_key in query or query in food_data['title'].lower()
+    }
+
+def synthetic_foods(base, size, rng):
+    """The real catalog plus made-up combinations of its words"""
+    foods = dict(base)
+    words = sorted({word for food_key in base for word in food_key.split()})
+    while len(foods) < size:
+        food_key = ' '.join(rng.sample(words, rng.randint(2, 4)))
+        if food_key not in foods:
+            template = rng.choice(list(base.values()))
+            foods[food_key] = {**template, 'id': f'indian_synthetic_{len(foods):05d}', 'title': food_key.title()}
+    return foods
+
+def sample_queries(foods, rng):
+    keys = list(foods)
+    words = sorted({word for food_key in keys for word in food_key.split()})
+    queries = ['', ' ', 'zzq', 'Dosa', 'DOSA ', 'masala do', 'plain dosa with chutney', '(', '2 pieces', 'a', 'p']
+    queries += rng.sample(keys, 40)
+    queries += [foods[food_key]['title'] for food_key in rng.sample(keys, 40)]
+    queries += rng.sample(words, 40)
+    queries += [word[:length] for word in rng.sample(words, 30) for length in (1, 2, 3, 4)]
+    for food_key in rng.sample(keys, 40):
+        start = rng.randrange(len(food_key))
+        queries.append(food_key[start:start + rng.randint(2, 8)])
+    queries += [f'{food_key} and rice' for food_key in rng.sample(keys, 10)]
+    # Repeated words, and single words that match nothing
+    queries += [f'{word} {word}' for word in rng.sample(words, 10)]
+    queries += [word[:-1] + 'q' for word in rng.sample(words, 20)] + ['palao', 'masale', 'tikka-masala', 'a-b']
+    return queries
+
+@pytest.fixture(scope='module')
+def foods():
+    with open(backend.CATALOG_PATH, encoding='utf-8') as f:
+        return synthetic_foods(json.load(f), 3000, random.Random(7))
+
+@pytest.fixture(scope='module')
+def index(foods):
+    return backend.FoodSearchIndex(backend.FoodCatalog(backend.FoodCatalog.compile(foods)))
+
+@pytest.fixture(scope='module')
+def queries(foods):
+    return sample_queries(foods, random.Random(11))
+
+def test_matches_are_those_of_the_linear_scan(foods, index, queries):
+    key_for_id = {food_data['id']: food_key for food_key, food_data in foods.items()}
+    for query in queries:
+        found = [key_for_id[food_data['id']] for food_data in index.search(query, limit=len(foods))]
+        assert len(found) == len(set(found)), query
+        assert set(found) == linear_scan(foods, query), query
+
+def test_limited_results_are_the_top_of_the_full_ranking(foods, index, queries):
+    for query in queries:
+        ranking = index.search(query, limit=len(foods))
+        for limit in (1, 3, 10):
+            assert index.search(query, limit=limit) == ranking[:limit], (query, limit)
+
+def test_exact_key_and_title_rank_first(foods, index):
+    assert index.search('dosa')[0]['id'] == foods['dosa']['id']
+    assert index.search(foods['dosa']['title'])[0]['id'] == foods['dosa']['id']
+
+def test_zero_limit_returns_nothing(index):
+    assert index.search('dosa', limit=0) == []
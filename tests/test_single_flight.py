@@ -0,0 +1,111 @@
+"""SingleFlight and AsyncSingleFlight share one call, and its error, between callers."""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from backend import app as backend
+
+class UpstreamDown(Exception):
+    pass
+
+def coalesced(flight):
+    return backend.metrics._counters[('upstream_coalesced_total', (('flight', flight.name),))]
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+def in_thread(fn, *args):
+    """Start ``fn(*args)`` on a thread; returns the thread and a list that receives its result or error"""
+    outcome = []
+
+    def run():
+        try:
+            outcome.append(fn(*args))
+        except Exception as e:
+            outcome.append(e)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread, outcome
+
+def blocking_failure(error):
+    """A fetch that waits for ``release`` and then raises ``error``; counts its calls"""
+    entered, release, calls = threading.Event(), threading.Event(), []
+
+    def fetch(*args):
+        calls.append(args)
+        entered.set()
+        release.wait(5)
+        raise error
+
+    return fetch, entered, release, calls
+
+def test_waiters_share_the_leaders_error():
+    flight = backend.SingleFlight('test-error')
+    error = UpstreamDown('spoonacular is down')
+    fetch, entered, release, calls = blocking_failure(error)
+
+    callers = [in_thread(flight.do, 'dosa', fetch)]
+    assert entered.wait(5)
+    callers += [in_thread(flight.do, 'dosa', fetch) for _ in range(4)]
+    # Every follower has joined the call in flight before it fails
+    wait_for(lambda: coalesced(flight) == 4)
+    release.set()
+    for thread, _ in callers:
+        thread.join(5)
+
+    assert len(calls) == 1
+    assert all(outcome == [error] and outcome[0] is error for _, outcome in callers)
+
+def test_failed_call_is_not_remembered():
+    flight = backend.SingleFlight('test-retry')
+
+    def fail():
+        raise UpstreamDown()
+
+    with pytest.raises(UpstreamDown):
+        flight.do('dosa', fail)
+    assert flight.do('dosa', lambda: 'fresh') == 'fresh'
+
+def test_batch_waiters_get_the_error_of_the_call_they_joined():
+    flight = backend.SingleFlight('test-batch')
+    error = UpstreamDown('bulk lookup failed')
+    fetch, entered, release, _ = blocking_failure(error)
+
+    leader, leader_outcome = in_thread(flight.do_many, ['a', 'b'], fetch)
+    assert entered.wait(5)
+    fetched = []
+    follower, follower_outcome = in_thread(
+        flight.do_many, ['b', 'c'], lambda keys: fetched.extend(keys) or {key: key for key in keys}
+    )
+    wait_for(lambda: coalesced(flight) == 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    # 'c' was fetched by the follower itself, 'b' failed with the leader's call
+    assert fetched == ['c']
+    assert leader_outcome == [error]
+    assert follower_outcome == [error]
+
+def test_async_waiters_share_the_error():
+    flight = backend.AsyncSingleFlight('test-async')
+    error = UpstreamDown('spoonacular is down')
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise error
+
+    async def main():
+        return await asyncio.gather(*(flight.do('dosa', fetch) for _ in range(5)), return_exceptions=True)
+
+    assert asyncio.run(main()) == [error] * 5
+    assert len(calls) == 1
+    assert flight._tasks == {}
@@ -0,0 +1,50 @@
+"""The catalog index is built at startup, not by the first search."""
+import asyncio
+import threading
+
+import pytest
+
+from backend import app as backend
+
+@pytest.fixture
+def unbuilt_index(monkeypatch):
+    for name in ('INDIAN_FOODS_DB', 'indian_food_index', '_catalog_mtime'):
+        monkeypatch.setattr(backend, name, getattr(backend, name))
+    monkeypatch.setattr(backend, 'indian_food_index', None)
+
+def test_asgi_startup_builds_the_index(unbuilt_index):
+    asgi_app = backend.create_asgi_app()
+
+    async def start():
+        messages = asyncio.Queue()
+        await messages.put({'type': 'lifespan.startup'})
+        started = asyncio.Event()
+
+        async def send(message):
+            if message['type'] == 'lifespan.startup.complete':
+                started.set()
+
+        lifespan = asyncio.ensure_future(asgi_app({'type': 'lifespan'}, messages.get, send))
+        await started.wait()
+        await asgi_app.index_build
+        lifespan.cancel()
+
+    asyncio.run(start())
+    assert backend.indian_food_index is not None
+
+@pytest.mark.filterwarnings('ignore::pytest.PytestUnhandledThreadExceptionWarning')
+def test_the_cache_warmer_builds_the_index_first(unbuilt_index, monkeypatch):
+    built = threading.Event()
+
+    def stop(*args):
+        # Taking the lease is the warmer's next step; end the thread there
+        if backend.indian_food_index is not None:
+            built.set()
+        raise SystemExit
+
+    monkeypatch.setattr(backend.query_stats, 'acquire_lease', stop)
+    warmer = threading.Thread(target=backend._run_cache_warmer, daemon=True)
+    warmer.start()
+    warmer.join(10)
+
+    assert built.is_set()
@@ -0,0 +1,37 @@
+"""The suggestion index is rebuilt only when served titles or the catalog changed."""
+import pytest
+
+from backend import app as backend
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    stats = backend.QueryStats(str(tmp_path / 'query_stats.sqlite3'))
+    monkeypatch.setattr(backend, 'query_stats', stats)
+    for name in ('_suggest_index', '_suggest_built_for', '_suggest_built_from', '_suggest_checked_at'):
+        monkeypatch.setattr(backend, name, None if name != '_suggest_checked_at' else 0.0)
+    return stats
+
+def refresh():
+    """What the background check does once SUGGEST_REFRESH_INTERVAL has passed"""
+    backend._suggest_rebuild_lock.acquire()
+    backend._rebuild_suggest_index_in_background()
+    return backend._suggest_index
+
+def test_unchanged_titles_keep_the_index(stats):
+    built = backend.current_suggest_index()
+    assert refresh() is built
+
+def test_newly_served_titles_rebuild_it(stats):
+    built = backend.current_suggest_index()
+    stats.record_served([{'id': 716429, 'title': 'Pasta with Garlic, Scallions, Cauliflower'}])
+    stats.flush()
+
+    rebuilt = refresh()
+    assert rebuilt is not built
+    assert ('716429', 'Pasta with Garlic, Scallions, Cauliflower') in rebuilt.suggest('pasta')
+    assert refresh() is rebuilt
+
+def test_a_new_catalog_index_rebuilds_it(stats, monkeypatch):
+    built = backend.current_suggest_index()
+    monkeypatch.setattr(backend, '_suggest_built_for', object())
+    assert refresh() is not built
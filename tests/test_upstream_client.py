@@ -0,0 +1,144 @@
+"""UpstreamClient against a local HTTP stub: retries, timeouts and the circuit breaker."""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend import app as backend
+
+class StubUpstream:
+    """Answers each GET with the next scripted ``(status, delay)``, repeating the last one"""
+
+    def __init__(self):
+        self.script = [(200, 0)]
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append((self.path, dict(self.headers)))
+                status, delay = stub.script.pop(0) if len(stub.script) > 1 else stub.script[0]
+                time.sleep(delay)
+                body = json.dumps({'status': status}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    # The client gave up waiting
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}'
+        threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+def client_for(upstream, retries=2, read_timeout=2, failure_threshold=5, reset_timeout=30):
+    return backend.UpstreamClient(
+        upstream.url, 'secret-key', connect_timeout=1, read_timeout=read_timeout, retries=retries, backoff=0,
+        breaker=backend.CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=reset_timeout)
+    )
+
+def test_a_503_is_retried_then_returned(upstream):
+    upstream.script = [(503, 0)]
+    client = client_for(upstream, retries=2)
+
+    response = client.get('/recipes/complexSearch', params={'query': 'dosa'})
+
+    assert response.status_code == 503
+    # One call plus two retries, counted as one failure by the breaker
+    assert len(upstream.requests) == 3
+    assert client.breaker.failures == 1
+
+def test_a_retry_that_succeeds_resets_the_breaker(upstream):
+    upstream.script = [(503, 0), (200, 0)]
+    client = client_for(upstream)
+    client.breaker.failures = 3
+
+    assert client.get('/recipes/complexSearch').status_code == 200
+    assert len(upstream.requests) == 2
+    assert client.breaker.failures == 0
+
+def test_the_api_key_goes_in_a_header_not_the_url(upstream):
+    client_for(upstream).get('/recipes/716429/information', params={'includeNutrition': 'true'})
+
+    path, headers = upstream.requests[0]
+    assert 'secret-key' not in path
+    assert headers['x-api-key'] == 'secret-key'
+
+def test_a_read_timeout_is_retried_then_raised(upstream):
+    upstream.script = [(200, 1.0)]
+    client = client_for(upstream, retries=1, read_timeout=0.2)
+
+    started = time.monotonic()
+    with pytest.raises(requests.Timeout):
+        client.get('/recipes/complexSearch')
+
+    assert len(upstream.requests) == 2
+    assert time.monotonic() - started < 1.5
+    assert client.breaker.failures == 1
+
+def test_the_breaker_opens_after_the_threshold(upstream):
+    upstream.script = [(500, 0)]
+    client = client_for(upstream, retries=0, failure_threshold=2)
+
+    client.get('/recipes/complexSearch')
+    assert not client.breaker.is_open
+    client.get('/recipes/complexSearch')
+    assert client.breaker.is_open
+
+    with pytest.raises(backend.UpstreamUnavailable):
+        client.get('/recipes/complexSearch')
+    # Rejected without calling upstream
+    assert len(upstream.requests) == 2
+
+def test_a_successful_half_open_trial_closes_the_breaker(upstream):
+    upstream.script = [(500, 0), (200, 0)]
+    client = client_for(upstream, retries=0, failure_threshold=1, reset_timeout=0.2)
+    client.get('/recipes/complexSearch')
+    assert client.breaker.is_open
+
+    time.sleep(0.25)
+    assert client.get('/recipes/complexSearch').status_code == 200
+    assert not client.breaker.is_open
+    assert len(upstream.requests) == 2
+
+def test_a_failed_half_open_trial_opens_the_breaker_again(upstream):
+    upstream.script = [(500, 0)]
+    client = client_for(upstream, retries=0, failure_threshold=1, reset_timeout=0.2)
+    client.get('/recipes/complexSearch')
+
+    time.sleep(0.25)
+    assert client.get('/recipes/complexSearch').status_code == 500
+    assert client.breaker.is_open
+    with pytest.raises(backend.UpstreamUnavailable):
+        client.get('/recipes/complexSearch')
+    assert len(upstream.requests) == 2
+
+def test_only_one_half_open_trial_goes_through():
+    breaker = backend.CircuitBreaker(failure_threshold=1, reset_timeout=0.2)
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    time.sleep(0.25)
+    assert breaker.allow()
+    # The rest wait for the trial's outcome
+    assert not breaker.allow()